@@ -0,0 +1,165 @@
+"""
+Check and benchmark of examples.process_api_output against a local stand-in of the Wikipedia api, which serves a
+synthetic history in batches with latency and occasional failures (http 503 and maxlag errors).
+
+Usage:
+
+    python -m WikiWho.benchmarks.api_fetcher --revisions 500 --batch 50 --latency 0.05 --fail-every 7
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import threading
+from timeit import default_timer
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.examples.process_api_output import create_session, process_api_output
+from WikiWho.wikiwho import Wikiwho
+
+
+class StandInApi(ThreadingMixIn, HTTPServer):
+    """
+    Serves revisions of one page like action=query&prop=revisions&rvdir=newer, `batch` revisions per response,
+    also from rvstartid.
+    Every `fail_every`th request fails, alternately with http 503 and a maxlag error.
+    """
+    daemon_threads = True
+
+    def __init__(self, revisions, page_id=1, title='Stand-in', batch=50, latency=0.0, fail_every=0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.revisions = revisions
+        self.page_id = page_id
+        self.title = title
+        self.batch = batch
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/w/api.php'.format(self.server_address[1])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def response(self, params):
+        """:return: (http status, json response)"""
+        with self.lock:
+            self.requests += 1
+            fail = self.fail_every and self.requests % self.fail_every == 0
+            if fail:
+                self.failures += 1
+        if fail:
+            if self.failures % 2:
+                return 503, {}
+            return 200, {'error': {'code': 'maxlag', 'info': 'Waiting for a database server'}}
+        if params.get('pageids') != str(self.page_id):
+            return 200, {'query': {'pages': {'-1': {'missing': ''}}}}
+        if 'rvcontinue' in params:
+            start = int(params['rvcontinue'])
+        else:
+            rvstartid = int(params.get('rvstartid', 0))
+            start = next((i for i, revision in enumerate(self.revisions) if revision['revid'] >= rvstartid),
+                         len(self.revisions))
+        end = start + self.batch
+        page = {'pageid': self.page_id, 'ns': 0, 'title': self.title, 'revisions': self.revisions[start:end]}
+        result = {'batchcomplete': '', 'query': {'pages': {str(self.page_id): page}}}
+        if end < len(self.revisions):
+            result['continue'] = {'rvcontinue': str(end), 'continue': '||'}
+        return 200, result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        if self.server.latency:
+            threading.Event().wait(self.server.latency)
+        status, result = self.server.response(params)
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def signature(wikiwho):
+    return ([(t.token_id, t.origin_rev_id, list(t.inbound), list(t.outbound)) for t in wikiwho.tokens],
+            wikiwho.ordered_revisions, list(wikiwho.spam_ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark the api fetcher against a local stand-in.')
+    parser.add_argument('--history', default='append', choices=sorted(HISTORIES))
+    parser.add_argument('--revisions', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=50, help='Revisions per api response.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per api response.')
+    parser.add_argument('--fail-every', type=int, default=7, help='Every nth request fails. 0 for no failures.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    revisions = HISTORIES[args.history](args.revisions, seed=args.seed)
+    expected = Wikiwho('Stand-in')
+    expected.analyse_article(revisions)
+
+    session = create_session()
+    print('{:>10} {:>10} {:>10} {:>10}'.format('prefetch', 'time (s)', 'requests', 'failures'))
+    for prefetch in (False, True):
+        server = StandInApi(revisions, batch=args.batch, latency=args.latency, fail_every=args.fail_every).start()
+        try:
+            start = default_timer()
+            wikiwho = process_api_output(1, url=server.url, session=session, prefetch=prefetch, backoff=0.01)
+            seconds = default_timer() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert signature(wikiwho) == signature(expected)
+        assert wikiwho.rvcontinue is None
+        print('{:>10} {:>10.3f} {:>10} {:>10}'.format(str(prefetch), seconds, server.requests, server.failures))
+
+    # continue after a failure in the middle of a batch: rvcontinue is of the batch before
+    server = StandInApi(revisions, batch=args.batch).start()
+    try:
+        wikiwho = Wikiwho('Stand-in')
+        wikiwho.analyse_article(revisions[:args.batch + args.batch // 2])
+        wikiwho.rvcontinue = str(args.batch)
+        process_api_output(1, url=server.url, session=session, wikiwho=wikiwho)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert signature(wikiwho) == signature(expected)
+
+    # continue after the whole history was analysed and new revisions are made
+    wikiwho = None
+    for served in (revisions[:len(revisions) // 2], revisions):
+        server = StandInApi(served, batch=args.batch).start()
+        try:
+            wikiwho = process_api_output(1, url=server.url, session=session, wikiwho=wikiwho)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert wikiwho.rvcontinue is None
+    assert signature(wikiwho) == signature(expected)
+    print('same analysis as analyse_article, also when continued in the middle of a batch and after new revisions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of bulk export of tokens: to_dict of structures against columns and csv of export module.
+Exported columns and csv are checked against the tokens.
+
+Usage:
+
+    python -m WikiWho.benchmarks.export --history append --revisions 2000
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import csv
+import io
+import tracemalloc
+from timeit import default_timer
+
+from WikiWho import export
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.wikiwho import Wikiwho
+
+
+def to_dicts(wikiwho):
+    """Export via to_dict of structures, as before."""
+    tokens = [word.to_dict() for word in wikiwho.tokens]
+    revisions = [revision.to_dict() for revision in export.iter_revisions(wikiwho)]
+    return tokens, revisions
+
+
+def to_columns(wikiwho):
+    return export.token_columns(wikiwho), export.revision_columns(wikiwho)
+
+
+def to_csv(wikiwho):
+    tokens = io.StringIO(newline='')
+    export.write_tokens_csv(wikiwho, tokens)
+    revisions = io.StringIO(newline='')
+    export.write_revisions_csv(wikiwho, revisions)
+    return tokens, revisions
+
+
+def measure(function, wikiwho):
+    tracemalloc.start()
+    start = default_timer()
+    result = function(wikiwho)
+    seconds = default_timer() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def check(wikiwho, columns, tokens_csv):
+    for n, word in enumerate(wikiwho.tokens):
+        assert columns['token_id'][n] == word.token_id and columns['value'][n] == word.value
+        inbound = columns['inbound'][columns['inbound_offsets'][n]:columns['inbound_offsets'][n + 1]]
+        outbound = columns['outbound'][columns['outbound_offsets'][n]:columns['outbound_offsets'][n + 1]]
+        assert list(inbound) == list(word.inbound) and list(outbound) == list(word.outbound)
+    tokens_csv.seek(0)
+    rows = list(csv.reader(tokens_csv))[1:]
+    assert len(rows) == len(wikiwho.tokens)
+    for row, word in zip(rows, wikiwho.tokens):
+        assert row[1] == word.value and row[4].split() == [str(rev_id) for rev_id in word.inbound]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk export of tokens and revisions.')
+    parser.add_argument('--history', default='append', choices=sorted(HISTORIES))
+    parser.add_argument('--revisions', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    wikiwho = Wikiwho(args.history)
+    wikiwho.analyse_article(HISTORIES[args.history](args.revisions, seed=args.seed))
+    print('{} tokens, {} revisions'.format(len(wikiwho.tokens), len(wikiwho.revisions)))
+    print('{:>10} {:>12} {:>12}'.format('export', 'time (s)', 'peak MiB'))
+    results = {}
+    for name, function in (('to_dict', to_dicts), ('columns', to_columns), ('csv', to_csv)):
+        results[name], seconds, peak = measure(function, wikiwho)
+        print('{:>10} {:>12.3f} {:>12.1f}'.format(name, seconds, peak / 2 ** 20))
+    check(wikiwho, results['columns'][0], results['csv'][0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark of the guarded diff backend on rewrites with many similar tokens (e.g. reformatted tables and link
+lists), where difflib.Differ is roughly cubic. Also reports how many current tokens are resolved to the same
+previous tokens as with Differ.
+
+Usage:
+
+    python -m WikiWho.benchmarks.guarded_diff --tokens 200 400 600
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import random
+from timeit import default_timer
+
+from WikiWho.diff import MAX_DIFF_COST, DifferBackend, GuardedBackend, resolve
+
+
+def similar_rewrite(n, seed):
+    """Previous and current tokens of a rewrite: mostly similar links, a few unique tokens (names, numbers)."""
+    rnd = random.Random(seed)
+    links = ['[[football club]]', '[[footbal clubs]]', '[[foot ball club]]', '[[football clubs]]']
+
+    def tokens(period):
+        return [rnd.choice(links) + str(i % period) if rnd.random() < 0.97 else 'name{}'.format(i) for i in range(n)]
+    return tokens(7), tokens(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark guarded diff against Differ.')
+    parser.add_argument('--tokens', type=int, nargs='*', default=[200, 400, 600],
+                        help='Numbers of previous and current tokens.')
+    parser.add_argument('--max-cost', type=int, default=MAX_DIFF_COST,
+                        help='Budget of the guarded backend. Default is the default of GuardedBackend.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    differ = DifferBackend()
+    guarded = GuardedBackend(max_cost=args.max_cost)
+    print('{:>8} {:>12} {:>12} {:>8} {:>10} {:>10}'.format(
+        'tokens', 'differ (s)', 'guarded (s)', 'guarded', 'fallbacks', 'same'))
+    for n in args.tokens:
+        tokens_prev, tokens_curr = similar_rewrite(n, args.seed)
+        start = default_timer()
+        matches, _ = resolve(differ.compare(tokens_prev, tokens_curr), tokens_curr)
+        differ_seconds = default_timer() - start
+        start = default_timer()
+        matches_guarded, _ = resolve(guarded.compare(tokens_prev, tokens_curr), tokens_curr)
+        guarded_seconds = default_timer() - start
+        same = sum(1 for match, match_guarded in zip(matches, matches_guarded) if match == match_guarded)
+        print('{:>8} {:>12.3f} {:>12.3f} {:>8} {:>10} {:>10.1%}'.format(
+            n, differ_seconds, guarded_seconds, str(guarded.guarded), guarded.fallbacks, same / n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark of hash functions of paragraphs and sentences (utils.HASH_FUNCTIONS): hashing throughput and memory of
+a hash table {hash_value: [obj]} as Wikiwho.sentences_ht.
+
+Usage:
+
+    python -m WikiWho.benchmarks.hashing --sentences 200000
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import random
+import sys
+import tracemalloc
+from timeit import default_timer
+
+from WikiWho.utils import HASH_FUNCTIONS, get_hash_function
+
+
+def random_sentences(n, seed):
+    rnd = random.Random(seed)
+    words = ['the', 'of', 'and', 'in', 'a', 'is', 'was', '[[', ']]', '|', 'city', 'river'] + \
+            ['word{}'.format(i) for i in range(5000)]
+    return [' '.join(rnd.choice(words) for _ in range(rnd.randint(3, 30))) + '.' for _ in range(n)]
+
+
+def measure(name, sentences, repeat=3):
+    calculate_hash = get_hash_function(name)
+    seconds = None
+    for _ in range(repeat):
+        start = default_timer()
+        for sentence in sentences:
+            calculate_hash(sentence)
+        elapsed = default_timer() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    hash_table = {}
+    for sentence in sentences:
+        hash_table.setdefault(calculate_hash(sentence), []).append(None)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(sentences) / seconds, sys.getsizeof(calculate_hash(sentences[0])), size / len(hash_table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hash functions of paragraphs and sentences.')
+    parser.add_argument('--sentences', type=int, default=200000, help='Number of sentences to hash.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    sentences = random_sentences(args.sentences, args.seed)
+    print('{:>12} {:>14} {:>10} {:>20}'.format('', 'sentences/s', 'key bytes', 'hash table bytes/key'))
+    for name in sorted(HASH_FUNCTIONS):
+        try:
+            throughput, key_size, size = measure(name, sentences)
+        except ValueError as e:
+            print('{:>12} {}'.format(name, e))
+            continue
+        print('{:>12} {:>14.0f} {:>10} {:>20.1f}'.format(name, throughput, key_size, size))
+
+
+if __name__ == '__main__':
+    main()
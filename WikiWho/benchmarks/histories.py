@@ -0,0 +1,280 @@
+"""
+Offline revision histories for benchmarks: seeded synthetic generators and stored corpora.
+
+Synthetic histories are lists of revisions in json form (as Wikipedia api returns them), so they can be analysed
+with Wikiwho.analyse_article. Corpora are written/read as json lines (optionally gzipped). XML dumps can be read
+as corpora too, if mwxml is installed.
+
+Example usage:
+
+    from WikiWho.benchmarks.histories import HISTORIES, write_corpus
+
+    revisions = HISTORIES['revert'](500, seed=1)
+    write_corpus(revisions, 'revert.jsonl.gz')
+"""
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import random
+from datetime import datetime, timedelta
+
+WORDS = ('the of and to in is was for on as with by he it at from his an were are which this be or has had not '
+         'first one their its new after who they have her she two been other when there all also into more time '
+         'during only school city world years state war government university team film season history people '
+         'national music game series river village population album church').split()
+MARKUP = ['[[', ']]', '{{', '}}', '|', "'''", '==', '<ref>', '</ref>', ',', '(', ')']
+_START = datetime(2010, 1, 1)
+
+
+def _word(rnd):
+    if rnd.random() < 0.1:
+        return rnd.choice(MARKUP)
+    return rnd.choice(WORDS)
+
+
+def _sentence(rnd):
+    return ' '.join(_word(rnd) for _ in range(rnd.randint(4, 20))) + rnd.choice(['.', '.', '.', '!', '?', ';'])
+
+
+def _paragraph(rnd):
+    return ' '.join(_sentence(rnd) for _ in range(rnd.randint(1, 5)))
+
+
+def _edit(rnd, paragraph):
+    """Insert, delete or replace a few words of the paragraph."""
+    words = paragraph.split(' ')
+    for _ in range(rnd.randint(1, 4)):
+        i = rnd.randrange(len(words) + 1)
+        op = rnd.random()
+        if op < 0.4 or len(words) < 2:
+            words.insert(i, _word(rnd))
+        elif op < 0.7:
+            del words[min(i, len(words) - 1)]
+        else:
+            words[min(i, len(words) - 1)] = _word(rnd)
+    return ' '.join(words)
+
+
+def _revision(rev_id, text, rnd, editors=20, **extra):
+    revision = {'revid': rev_id, 'timestamp': (_START + timedelta(hours=rev_id)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'userid': rnd.randint(0, editors), 'user': 'editor{}'.format(rnd.randint(0, editors)), '*': text}
+    revision.update(extra)
+    return revision
+
+
+def append_heavy(n, seed=42):
+    """Articles which mostly grow: sentences and paragraphs are appended at the end, few edits in between."""
+    rnd = random.Random(seed)
+    paragraphs = [_paragraph(rnd) for _ in range(3)]
+    revisions = []
+    for rev_id in range(1, n + 1):
+        op = rnd.random()
+        if op < 0.6:
+            paragraphs[-1] += ' ' + _sentence(rnd)
+        elif op < 0.85:
+            paragraphs.append(_paragraph(rnd))
+        else:
+            i = rnd.randrange(len(paragraphs))
+            paragraphs[i] = _edit(rnd, paragraphs[i])
+        revisions.append(_revision(rev_id, '\n\n'.join(paragraphs), rnd))
+    return revisions
+
+
+def revert_heavy(n, seed=42):
+    """Edit wars: many reverts to one of the last revisions and null edits between small edits."""
+    rnd = random.Random(seed)
+    paragraphs = [_paragraph(rnd) for _ in range(15)]
+    texts = []
+    revisions = []
+    for rev_id in range(1, n + 1):
+        op = rnd.random()
+        if op < 0.35 and texts:
+            text = rnd.choice(texts[-5:])
+        elif op < 0.45 and texts:
+            text = texts[-1]
+        else:
+            i = rnd.randrange(len(paragraphs))
+            if rnd.random() < 0.2:
+                paragraphs.insert(i, _paragraph(rnd))
+            else:
+                paragraphs[i] = _edit(rnd, paragraphs[i])
+            text = '\n\n'.join(paragraphs)
+        texts.append(text)
+        revisions.append(_revision(rev_id, text, rnd, editors=3))
+    return revisions
+
+
+def _table(rnd, rows):
+    lines = ['{| class="wikitable"', '! year !! club !! apps !! goals']
+    for row in rows:
+        lines.append('|-')
+        lines.append('| ' + ' || '.join(row))
+    lines.append('|}')
+    return '\n'.join(lines)
+
+
+def _row(rnd):
+    return [str(rnd.randint(1950, 2017)), '[[{} fc]]'.format(rnd.choice(WORDS)), str(rnd.randint(0, 40)),
+            str(rnd.randint(0, 20))]
+
+
+def table_heavy(n, seed=42):
+    """Articles made of wiki tables (career statistics, lists) where cells and rows change."""
+    rnd = random.Random(seed)
+    intro = _paragraph(rnd)
+    tables = [[_row(rnd) for _ in range(rnd.randint(5, 30))] for _ in range(3)]
+    revisions = []
+    for rev_id in range(1, n + 1):
+        table = rnd.choice(tables)
+        op = rnd.random()
+        if op < 0.5:
+            row = rnd.choice(table)
+            row[rnd.randrange(len(row))] = str(rnd.randint(0, 40))
+        elif op < 0.8:
+            table.insert(rnd.randint(0, len(table)), _row(rnd))
+        elif op < 0.9 and len(table) > 2:
+            del table[rnd.randrange(len(table))]
+        elif op < 0.95:
+            tables.append([_row(rnd) for _ in range(rnd.randint(5, 15))])
+        else:
+            intro = _edit(rnd, intro)
+        text = '\n\n'.join([intro] + [_table(rnd, rows) for rows in tables])
+        revisions.append(_revision(rev_id, text, rnd))
+    return revisions
+
+
+def vandalism_heavy(n, seed=42):
+    """
+    Frequently vandalised articles: blanking, mass deletions, repeated token spam and reinserting vandalised
+    content, each mostly reverted by the next revision.
+    """
+    rnd = random.Random(seed)
+    paragraphs = [_paragraph(rnd) for _ in range(20)]
+    good = '\n\n'.join(paragraphs)
+    vandalised = []
+    revisions = []
+    for rev_id in range(1, n + 1):
+        op = rnd.random()
+        if op < 0.15:
+            # blanking
+            text = rnd.choice(['', 'lol', good[:rnd.randint(0, 500)]])
+        elif op < 0.3:
+            # token spam
+            words = ' '.join([rnd.choice(['lol', 'poop', 'haha'])] * rnd.randint(50, 300))
+            text = good + '\n\n' + words
+        elif op < 0.4 and vandalised:
+            # same vandalism again
+            text = rnd.choice(vandalised)
+        elif op < 0.5:
+            # vandalism inside text
+            i = rnd.randrange(len(paragraphs))
+            text = '\n\n'.join(paragraphs[:i] + [_edit(rnd, paragraphs[i]) + ' is stupid'] + paragraphs[i + 1:])
+        else:
+            # good faith edit or revert to last good revision
+            if rnd.random() < 0.5:
+                i = rnd.randrange(len(paragraphs))
+                paragraphs[i] = _edit(rnd, paragraphs[i])
+                good = '\n\n'.join(paragraphs)
+            text = good
+        if text != good:
+            vandalised.append(text)
+        revisions.append(_revision(rev_id, text, rnd, editors=50))
+    return revisions
+
+
+def restructure_heavy(n, seed=42):
+    """
+    Large restructures: paragraphs are merged, split and reflowed, so most paragraphs are unmatched while their
+    sentences are still there.
+    """
+    rnd = random.Random(seed)
+
+    def sentence():
+        # larger vocabulary, otherwise new content with many repeated words is detected as vandalism
+        words = ['{}{}'.format(rnd.choice(WORDS), rnd.randint(0, 200)) for _ in range(rnd.randint(4, 20))]
+        return ' '.join(words) + rnd.choice(['.', '.', '!', '?'])
+
+    sentences = [sentence() for _ in range(600)]
+    revisions = []
+    for rev_id in range(1, n + 1):
+        op = rnd.random()
+        if op < 0.3:
+            i = rnd.randrange(len(sentences))
+            sentences[i] = _edit(rnd, sentences[i])
+        elif op < 0.5:
+            sentences.insert(rnd.randrange(len(sentences)), sentence())
+        # new paragraph boundaries
+        paragraphs = []
+        i = 0
+        while i < len(sentences):
+            size = rnd.randint(1, 8)
+            paragraphs.append(' '.join(sentences[i:i + size]))
+            i += size
+        revisions.append(_revision(rev_id, '\n\n'.join(paragraphs), rnd))
+    return revisions
+
+
+def boilerplate_heavy(n, seed=42):
+    """
+    Articles with many repeated paragraphs and sentences (templates, table row separators, empty sections), which
+    build up long candidate lists in hash tables.
+    """
+    rnd = random.Random(seed)
+    boilerplate = ['{{reflist}}', '|-', '== see also ==', '{{citation needed}}.']
+    paragraphs = [_paragraph(rnd)]
+    revisions = []
+    for rev_id in range(1, n + 1):
+        op = rnd.random()
+        if op < 0.5:
+            paragraphs.insert(rnd.randint(0, len(paragraphs)), rnd.choice(boilerplate))
+        elif op < 0.7:
+            paragraphs.insert(rnd.randint(0, len(paragraphs)), _paragraph(rnd) + ' {{citation needed}}.')
+        elif op < 0.9 and len(paragraphs) > 1:
+            del paragraphs[rnd.randrange(len(paragraphs))]
+        else:
+            i = rnd.randrange(len(paragraphs))
+            paragraphs[i] = _edit(rnd, paragraphs[i])
+        revisions.append(_revision(rev_id, '\n\n'.join(paragraphs), rnd))
+    return revisions
+
+
+HISTORIES = {
+    'append': append_heavy,
+    'boilerplate': boilerplate_heavy,
+    'restructure': restructure_heavy,
+    'revert': revert_heavy,
+    'table': table_heavy,
+    'vandalism': vandalism_heavy,
+}
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+def write_corpus(revisions, path):
+    """Write revisions in json form into a json lines file. Gzipped if path ends with .gz."""
+    with _open(path, 'w') as f:
+        for revision in revisions:
+            f.write(json.dumps(revision, ensure_ascii=False) + '\n')
+
+
+def read_corpus(path):
+    """
+    Read stored histories.
+    :param path: Json lines (.jsonl, .jsonl.gz) of revisions in json form, or an xml dump (needs mwxml).
+    :return: Generator of (title, revisions, kind) per article. kind is 'json' or 'xml'.
+    """
+    if '.xml' in path:
+        from mwtypes.files import reader
+        from mwxml import Dump
+        for page in Dump.from_file(reader(path)):
+            yield page.title, list(page), 'xml'
+    else:
+        with _open(path, 'r') as f:
+            revisions = [json.loads(line) for line in f if line.strip()]
+        yield path, revisions, 'json'
@@ -0,0 +1,86 @@
+"""
+Benchmark of authorship query latency with index.AuthorshipIndex against walking revisions and words of Wikiwho.
+Answers of both are compared.
+
+Usage:
+
+    python -m WikiWho.benchmarks.queries --history append --revisions 1000 --queries 200
+"""
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import random
+from timeit import default_timer
+
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.index import AuthorshipIndex
+from WikiWho.utils import iter_rev_tokens
+from WikiWho.wikiwho import Wikiwho
+
+
+def walk_revision(wikiwho, rev_id):
+    return [word.token_id for word in iter_rev_tokens(wikiwho.revisions[rev_id])]
+
+
+def walk_owner(wikiwho, rev_id, position):
+    word = list(iter_rev_tokens(wikiwho.revisions[rev_id]))[position]
+    return wikiwho.revisions[word.origin_rev_id].editor
+
+
+def walk_surviving_tokens(wikiwho, editor, rev_id):
+    return sorted(word.token_id for word in iter_rev_tokens(wikiwho.revisions[rev_id])
+                  if wikiwho.revisions[word.origin_rev_id].editor == editor)
+
+
+def timed(function, queries):
+    start = default_timer()
+    answers = [function(*query) for query in queries]
+    return answers, (default_timer() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark authorship query latency.')
+    parser.add_argument('--history', default='append', choices=sorted(HISTORIES))
+    parser.add_argument('--revisions', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries of each kind.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    wikiwho = Wikiwho(args.history)
+    wikiwho.analyse_article(HISTORIES[args.history](args.revisions, seed=args.seed))
+    start = default_timer()
+    index = AuthorshipIndex.from_wikiwho(wikiwho)
+    print('index of {} revisions and {} tokens built in {:.3f} s'.format(
+        len(index.ordered_revisions), len(index.origin_rev_ids), default_timer() - start))
+
+    rnd = random.Random(args.seed)
+    rev_ids = [rev_id for rev_id in wikiwho.ordered_revisions if rev_id in wikiwho.revisions
+               and wikiwho.revisions[rev_id].ordered_paragraphs]
+    editors = sorted(set(revision.editor for revision in wikiwho.revisions.values()))
+    revision_queries = [(rnd.choice(rev_ids), ) for _ in range(args.queries)]
+    owner_queries = []
+    for _ in range(args.queries):
+        rev_id = rnd.choice(rev_ids)
+        owner_queries.append((rev_id, rnd.randrange(len(index.revision(rev_id)))))
+    # mostly asked about the current revision
+    current_queries = [(rnd.choice(editors), rev_ids[-1]) for _ in range(args.queries)]
+    surviving_queries = [(rnd.choice(editors), rnd.choice(rev_ids)) for _ in range(args.queries)]
+
+    print('{:>20} {:>14} {:>14} {:>10}'.format('query', 'walk (us)', 'index (us)', 'speedup'))
+    for name, walk, query, queries in (
+            ('revision', lambda rev_id: walk_revision(wikiwho, rev_id), index.revision, revision_queries),
+            ('owner', lambda rev_id, position: walk_owner(wikiwho, rev_id, position), index.owner, owner_queries),
+            ('surviving (current)', lambda editor, rev_id: walk_surviving_tokens(wikiwho, editor, rev_id),
+             index.surviving_tokens, current_queries),
+            ('surviving (any)', lambda editor, rev_id: walk_surviving_tokens(wikiwho, editor, rev_id),
+             index.surviving_tokens, surviving_queries)):
+        expected, walk_seconds = timed(walk, queries)
+        answers, index_seconds = timed(query, queries)
+        assert [list(answer) if name == 'revision' else answer for answer in answers] == expected, name
+        print('{:>20} {:>14.1f} {:>14.1f} {:>9.0f}x'.format(
+            name, walk_seconds * 1e6, index_seconds * 1e6, walk_seconds / index_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark of peak memory of analysing a long history with all revisions kept (default) and with
+keep_revisions=False, where only the last accepted revision is kept.
+
+Usage:
+
+    python -m WikiWho.benchmarks.revision_memory --history append --revisions 2000 5000
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import tracemalloc
+from timeit import default_timer
+
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.wikiwho import Wikiwho
+
+
+def measure(history, n, keep_revisions, seed):
+    # revisions are generated before tracing, so only the analysis is measured
+    revisions = HISTORIES[history](n, seed=seed)
+    gc.collect()
+    tracemalloc.start()
+    start = default_timer()
+    wikiwho = Wikiwho(history, keep_revisions=keep_revisions)
+    wikiwho.analyse_article(revisions)
+    seconds = default_timer() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, seconds, len(wikiwho.tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark peak memory of long histories.')
+    parser.add_argument('--history', default='append', choices=sorted(HISTORIES))
+    parser.add_argument('--revisions', type=int, nargs='+', default=[500, 1000, 2000],
+                        help='Number of revisions in history.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>9} {:>14} {:>9} {:>14} {:>14} {:>10}'.format(
+        'revisions', 'keep_revisions', 'tokens', 'final (MiB)', 'peak (MiB)', 'time (s)'))
+    for n in args.revisions:
+        for keep_revisions in (True, False):
+            current, peak, seconds, tokens = measure(args.history, n, keep_revisions, args.seed)
+            print('{:>9} {:>14} {:>9} {:>14.1f} {:>14.1f} {:>10.1f}'.format(
+                n, str(keep_revisions), tokens, current / 2 ** 20, peak / 2 ** 20, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of utils.split_into_paragraphs and utils.split_into_sentences against the previous splitters, which
+made a chain of replace passes and inserted '\\n\\n' / '@@@@' markers. Both give the same paragraphs and
+sentences, which is tested in tests/test_splitters.py.
+
+Usage:
+
+    python -m WikiWho.benchmarks.splitters --paragraphs 200
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import random
+from timeit import default_timer
+
+from WikiWho.utils import regex_dot, regex_url, split_into_paragraphs, split_into_sentences
+
+
+def legacy_split_into_paragraphs(text):
+    """Previous implementation of utils.split_into_paragraphs, the reference of the current one."""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    # html table syntax
+    text = text.replace('<table>', '\n\n<table>').replace('</table>', '</table>\n\n')
+    text = text.replace('<tr>', '\n\n<tr>').replace('</tr>', '</tr>\n\n')
+    # wp table syntax
+    text = text.replace('{|', '\n\n{|').replace('|}', '|}\n\n')
+    text = text.replace('|-\n', '\n\n|-\n')
+    return text.split('\n\n')
+
+
+def legacy_split_into_sentences(text):
+    """Previous implementation of utils.split_into_sentences, the reference of the current one."""
+    text = text.replace('\n', '\n@@@@')
+    text = regex_dot.sub(r'\1@@@@', text)
+    text = text.replace('; ', ';@@@@')
+    text = text.replace('? ', '?@@@@')
+    text = text.replace('! ', '!@@@@')
+    text = text.replace(': ', ':@@@@')
+    text = text.replace('\t', '\t@@@@')
+    # comments as sentence
+    text = text.replace('<!--', '@@@@<!--')
+    text = text.replace('-->', '-->@@@@')
+    # references as sentence. ex: <ref name="...">{{ ... }}</ref>
+    text = text.replace('<ref', '@@@@<ref')
+    text = text.replace('/ref>', '/ref>@@@@')
+    # urls as sentence
+    text = regex_url.sub(r'@@@@\1@@@@', text)
+
+    while '@@@@@@@@' in text:
+        text = text.replace('@@@@@@@@', '@@@@')
+    return text.split('@@@@')
+
+
+# Pieces which are special to the splitters are much more frequent than in real text.
+PARAGRAPH_PIECES = ['\n', '\n', '\r', '\r\n', '<table>', '</table>', '<tr>', '</tr>', '{|', '|}', '|-', '|', '-', '{',
+                    '}', 'a', ' ', 'x.']
+SENTENCE_PIECES = ['\n', '\t', ' ', ' ', '.', '. ', '; ', '? ', '! ', ': ', ':', '=', '@', '@@', '@@@@', '<!--',
+                   '-->', '-', '<', '>', '<ref', '/ref>', '</ref>', 'http', '://', 'http://', '|', '\r', 'a', 'bc',
+                   'def', '\xa0']
+
+
+def random_text(rnd, pieces, max_length=30):
+    return ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, max_length)))
+
+
+def wiki_paragraph(rnd):
+    words = ['the', 'river', 'of', 'city', '1879', '[[link]]', '{{cite}}', 'a', 'was', 'is']
+    sentences = []
+    for _ in range(rnd.randint(1, 8)):
+        sentence = ' '.join(rnd.choice(words) for _ in range(rnd.randint(3, 25)))
+        sentence += rnd.choice(['.', '.', '!', '?', ':', ';', '<ref name="a">http://example.org/a b</ref>.',
+                                ' <!-- note -->'])
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+
+def wiki_text(rnd, paragraphs):
+    parts = []
+    for _ in range(paragraphs):
+        op = rnd.random()
+        if op < 0.1:
+            parts.append('{| class="wikitable"\n|-\n| a || b\n|-\n| c || d\n|}')
+        elif op < 0.15:
+            parts.append('<table><tr><td>a</td></tr><tr><td>b</td></tr></table>')
+        else:
+            parts.append(wiki_paragraph(rnd))
+    return '\n\n'.join(parts)
+
+
+def best_time(function, texts, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        for text in texts:
+            function(text)
+        seconds = default_timer() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the paragraph and sentence splitters.')
+    parser.add_argument('--paragraphs', type=int, default=200, help='Number of paragraphs in revision text.')
+    parser.add_argument('--revisions', type=int, default=100, help='Number of revision texts to split.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    texts = [wiki_text(rnd, args.paragraphs).lower() for _ in range(args.revisions)]
+    paragraphs = [p for text in texts for p in split_into_paragraphs(text)]
+    print('{:>11} {:>12} {:>12} {:>9}'.format('', 'legacy (s)', 'current (s)', 'speedup'))
+    for name, legacy, current, inputs in (
+            ('paragraphs', legacy_split_into_paragraphs, split_into_paragraphs, texts),
+            ('sentences', legacy_split_into_sentences, split_into_sentences, paragraphs)):
+        legacy_time = best_time(legacy, inputs)
+        current_time = best_time(current, inputs)
+        print('{:>11} {:>12.3f} {:>12.3f} {:>8.1f}x'.format(name, legacy_time, current_time,
+                                                             legacy_time / current_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark suite of Wikiwho analysis on offline revision histories.
+
+For each history it reports throughput (revisions/s, tokens/s), time of paragraph, sentence and word stages, of
+tokenizer and of hashing, and peak memory. Results are written as json, so runs of different versions can be
+compared.
+
+Usage:
+
+    python -m WikiWho.benchmarks.suite --revisions 500 --output before.json
+    python -m WikiWho.benchmarks.suite --revisions 500 --corpus article.jsonl.gz dump.xml.bz2 --output after.json
+    python -m WikiWho.benchmarks.suite --compare before.json after.json
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from timeit import default_timer
+
+from WikiWho import utils as utils_module
+from WikiWho.benchmarks.histories import HISTORIES, read_corpus
+from WikiWho.instrumentation import StatsCollector
+from WikiWho.utils import iter_rev_tokens
+from WikiWho.wikiwho import Wikiwho
+
+STAGES = ('paragraphs', 'sentences', 'words', 'tokenizer', 'hashing')
+
+
+def analyse(title, revisions, kind):
+    wikiwho = Wikiwho(title)
+    if kind == 'xml':
+        wikiwho.analyse_article_from_xml_dump(revisions)
+    else:
+        wikiwho.analyse_article(revisions)
+    return wikiwho
+
+
+class StageTimer(object):
+    """
+    Sums time of stages from instrumentation of Wikiwho and time of tokenizer and hash function by wrapping them.
+    """
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.collector = StatsCollector()
+
+    def wrap(self, stage, function):
+        seconds = self.seconds
+
+        def timed(*args, **kwargs):
+            start = default_timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[stage] += default_timer() - start
+        return timed
+
+    def analyse(self, title, revisions, kind):
+        wikiwho = Wikiwho(title, instrument=self.collector)
+        wikiwho.calculate_hash = self.wrap('hashing', wikiwho.calculate_hash)
+        split_into_tokens = utils_module.split_into_tokens
+        utils_module.split_into_tokens = self.wrap('tokenizer', split_into_tokens)
+        try:
+            if kind == 'xml':
+                wikiwho.analyse_article_from_xml_dump(revisions)
+            else:
+                wikiwho.analyse_article(revisions)
+        finally:
+            utils_module.split_into_tokens = split_into_tokens
+        for stage in ('paragraphs', 'sentences', 'words'):
+            self.seconds[stage] = self.collector.totals[stage + '_seconds']
+        return self.seconds
+
+
+def run_case(name, revisions, kind, repeat=3):
+    """Analyse the history `repeat` times for timing, once with stage timers and once with tracemalloc."""
+    seconds = None
+    for _ in range(repeat):
+        start = default_timer()
+        wikiwho = analyse(name, revisions, kind)
+        elapsed = default_timer() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    tokens = sum(1 for rev_id in wikiwho.ordered_revisions for _ in iter_rev_tokens(wikiwho.revisions[rev_id]))
+
+    stage_timer = StageTimer()
+    stages = stage_timer.analyse(name, revisions, kind)
+    stats = stage_timer.collector.to_dict()
+
+    tracemalloc.start()
+    analyse(name, revisions, kind)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'kind': kind,
+        'revisions': len(revisions),
+        'accepted_revisions': len(wikiwho.ordered_revisions),
+        'tokens': tokens,  # sum of tokens of accepted revisions
+        'tokens_created': len(wikiwho.tokens),
+        'seconds': seconds,
+        'revisions_per_second': len(revisions) / seconds,
+        'tokens_per_second': tokens / seconds,
+        # stages are timed in a separate run. tokenizer and hashing are part of paragraphs and sentences stages.
+        'stage_seconds': stages,
+        # counters of instrumentation (see RevisionStats) and vandalism decisions
+        'stats': stats['totals'],
+        'vandalism': stats['vandalism'],
+        'peak_memory_bytes': peak,
+    }
+
+
+def iter_cases(args):
+    for history in args.histories:
+        revisions = HISTORIES[history](args.revisions, seed=args.seed)
+        yield '{}-{}'.format(history, args.revisions), revisions, 'json'
+    for path in args.corpus:
+        for title, revisions, kind in read_corpus(path):
+            yield title, revisions, kind
+
+
+def print_results(results, out=sys.stderr):
+    print('{:>24} {:>6} {:>9} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>9}'.format(
+        'history', 'revs', 'tokens', 'revs/s', 'tokens/s', 'paragraphs', 'sentences', 'words', 'tokenizer',
+        'hashing', 'peak MiB'), file=out)
+    for r in results:
+        stages = r['stage_seconds']
+        print('{:>24} {:>6} {:>9} {:>10.1f} {:>10.0f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>9.1f}'.format(
+            r['name'][-24:], r['revisions'], r['tokens'], r['revisions_per_second'], r['tokens_per_second'],
+            stages['paragraphs'], stages['sentences'], stages['words'], stages['tokenizer'], stages['hashing'],
+            r['peak_memory_bytes'] / 2 ** 20), file=out)
+
+
+def compare(path_before, path_after):
+    """Print ratio of after / before for throughput and memory of histories which are in both runs."""
+    with open(path_before) as f:
+        before = {r['name']: r for r in json.load(f)['results']}
+    with open(path_after) as f:
+        after = json.load(f)['results']
+    print('{:>24} {:>12} {:>12} {:>12}'.format('history', 'revs/s', 'tokens/s', 'peak memory'))
+    for r in after:
+        b = before.get(r['name'])
+        if b is None:
+            continue
+        print('{:>24} {:>11.2f}x {:>11.2f}x {:>11.2f}x'.format(
+            r['name'][-24:], r['revisions_per_second'] / b['revisions_per_second'],
+            r['tokens_per_second'] / b['tokens_per_second'], r['peak_memory_bytes'] / b['peak_memory_bytes']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Wikiwho analysis on offline revision histories.')
+    parser.add_argument('--histories', nargs='*', default=sorted(HISTORIES), choices=sorted(HISTORIES),
+                        help='Synthetic histories to generate.')
+    parser.add_argument('--revisions', type=int, default=300, help='Number of revisions of synthetic histories.')
+    parser.add_argument('--corpus', nargs='*', default=[],
+                        help='Stored histories: json lines of api revisions (.jsonl[.gz]) or xml dumps.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timing runs, best one is reported.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Json file for results. Default is stdout.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files.')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = [run_case(name, revisions, kind, args.repeat) for name, revisions, kind in iter_cases(args)]
+    print_results(results)
+    output = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': args.seed,
+            'revisions': args.revisions,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of memory used per token (structures.Word) as it is created in word level analysis.
+
+Usage:
+
+    python -m WikiWho.benchmarks.token_memory --tokens 1000000 --changed 0.1
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import random
+import tracemalloc
+
+from WikiWho.structures import Word
+
+
+class DictWord(object):
+    """Previous Word implementation: __dict__ per object and two lists per word."""
+    def __init__(self):
+        self.token_id = 0
+        self.value = ''
+        self.origin_rev_id = 0
+        self.outbound = []
+        self.inbound = []
+        self.last_rev_id = 0
+        self.matched = False
+
+    def add_outbound(self, rev_id):
+        self.outbound.append(rev_id)
+
+    def add_inbound(self, rev_id):
+        self.inbound.append(rev_id)
+
+
+def build_tokens(word_class, n, changed, seed):
+    """Create n words the way analyser does. changed is the ratio of words which are deleted and reinserted."""
+    rnd = random.Random(seed)
+    vocabulary = ['the', 'of', '[[', ']]', '|', '.', ',', 'and', '{{', '}}'] + \
+                 ['word{}'.format(i) for i in range(5000)]
+    tokens = []
+    rev_id = 700000000
+    for token_id in range(n):
+        if token_id % 200 == 0:
+            rev_id += 1
+        word = word_class()
+        word.value = rnd.choice(vocabulary)
+        word.token_id = token_id
+        word.origin_rev_id = rev_id
+        word.last_rev_id = rev_id
+        tokens.append(word)
+    for word in rnd.sample(tokens, int(n * changed)):
+        word.add_outbound(rev_id + 1)
+        word.add_inbound(rev_id + 2)
+    return tokens
+
+
+def measure(word_class, n, changed, seed):
+    gc.collect()
+    tracemalloc.start()
+    tokens = build_tokens(word_class, n, changed, seed)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+    return current / n, peak / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark memory per token.')
+    parser.add_argument('--tokens', type=int, default=200000, help='Number of tokens to create.')
+    parser.add_argument('--changed', type=float, default=0.1,
+                        help='Ratio of tokens with outbound and inbound revisions.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>10} {:>16} {:>16}'.format('', 'bytes/token', 'peak bytes/token'))
+    for name, word_class in (('before', DictWord), ('after', Word)):
+        current, peak = measure(word_class, args.tokens, args.changed, args.seed)
+        print('{:>10} {:>16.1f} {:>16.1f}'.format(name, current, peak))
+
+
+if __name__ == '__main__':
+    main()
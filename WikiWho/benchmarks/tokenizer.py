@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of utils.split_into_tokens against the previous tokenizer, which made one str.replace pass per symbol.
+Both give the same tokens, which is tested in tests/test_tokenizer.py.
+
+Usage:
+
+    python -m WikiWho.benchmarks.tokenizer --sentences 20000
+"""
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import random
+from timeit import default_timer
+
+from WikiWho.utils import SYMBOLS, split_into_tokens
+
+
+def legacy_split_into_tokens(text):
+    """Previous implementation of utils.split_into_tokens, the reference of the current one."""
+    text = text.replace('|', '||ææææ||')  # use | as delimiter
+
+    text = text.replace('\n', '||').replace(' ', '||')
+
+    for c in SYMBOLS:
+        text = text.replace(c, '||{}||'.format(c))
+
+    # re-construct some special character groups as they are tokens
+    text = text.replace('[||||[', '[[').replace(']||||]', ']]')
+    text = text.replace('{||||{', '{{').replace('}||||}', '}}')
+    text = text.replace('<||||!||||-||||-||', '||<!--||').replace('||-||||-||||>', '||-->||')
+
+    while '||||' in text:
+        text = text.replace('||||', '||')
+
+    tokens = filter(lambda a: a != '', text.split('||'))  # filter empty strings
+    tokens = ['|' if w == 'ææææ' else w for w in tokens]  # insert back the |s
+    return tokens
+
+
+# Characters which are special to the tokenizer are much more frequent than in real text.
+ALPHABET = ['[', ']', '{', '}', '<', '>', '!', '-', '|', ' ', '\n', 'æ', 'ææææ', 'a', 'b', '1', '\t', '\r'] + SYMBOLS
+
+
+def random_text(rnd, max_length=40):
+    return ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, max_length)))
+
+
+def wiki_sentence(rnd):
+    parts = ['the', 'river', 'of', '1879', '[[', 'city', '|', 'town', ']]', '{{', 'cite', 'web', '|', 'url', '=',
+             'http://example.org/a_b', '}}', '<ref>', '</ref>', '<!--', 'note', '-->', "'''", 'bold', ',', '.']
+    return ' '.join(rnd.choice(parts) for _ in range(rnd.randint(5, 40))).replace('[[ ', '[[').replace(' ]]', ']]')
+
+
+def run(n, seed, repeat=3):
+    rnd = random.Random(seed)
+    sentences = [wiki_sentence(rnd) for _ in range(n)]
+    results = []
+    for name, tokenizer in (('legacy', legacy_split_into_tokens), ('current', split_into_tokens)):
+        best = None
+        for _ in range(repeat):
+            start = default_timer()
+            for sentence in sentences:
+                tokenizer(sentence)
+            seconds = default_timer() - start
+            best = seconds if best is None else min(best, seconds)
+        results.append((name, best))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the tokenizer.')
+    parser.add_argument('--sentences', type=int, default=20000, help='Number of sentences to tokenize.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results = run(args.sentences, args.seed)
+    legacy_time = results[0][1]
+    print('{:>8} {:>10} {:>9}'.format('', 'time (s)', 'speedup'))
+    for name, seconds in results:
+        print('{:>8} {:>10.3f} {:>8.1f}x'.format(name, seconds, legacy_time / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark of resolving word diff output to previous tokens on large rewrites (tables, reference lists).
+
+Usage:
+
+    python -m WikiWho.benchmarks.word_diff --tokens 2000 5000 10000
+"""
+from __future__ import print_function
+
+import argparse
+import random
+from timeit import default_timer
+
+from WikiWho.diff import DELETE, EQUAL, INSERT, MyersBackend, resolve
+
+
+def rescan_resolve(diff, tokens_prev, tokens_curr):
+    """
+    Previous resolution of word level analysis: for each current token rescan the diff from the start and
+    then scan the previous tokens for the first not matched one with the same value.
+    """
+    diff = list(diff)
+    matched_prev = [False] * len(tokens_prev)
+    matches = []
+    deleted = []
+    diff_len = len(diff)
+    for word in tokens_curr:
+        match = None
+        pos = 0
+        while pos < diff_len:
+            tag, word_diff = diff[pos]
+            if word == word_diff:
+                if tag == EQUAL:
+                    for i, word_prev in enumerate(tokens_prev):
+                        if not matched_prev[i] and word_prev == word:
+                            matched_prev[i] = True
+                            match = i
+                            diff[pos] = (None, None)
+                            pos = diff_len + 1
+                            break
+                elif tag == DELETE:
+                    for i, word_prev in enumerate(tokens_prev):
+                        if not matched_prev[i] and word_prev == word:
+                            matched_prev[i] = True
+                            deleted.append(i)
+                            diff[pos] = (None, None)
+                            break
+                elif tag == INSERT:
+                    diff[pos] = (None, None)
+                    pos = diff_len + 1
+            pos += 1
+        matches.append(match)
+    return tuple(matches), deleted
+
+
+def table_tokens(rows, rnd):
+    tokens = []
+    for _ in range(rows):
+        tokens.extend(['|', '-', '|', str(rnd.randint(1900, 2017)), '|', '|', '[[', 'club', str(rnd.randint(1, 50)),
+                       ']]', '|', '|', str(rnd.randint(0, 40))])
+    return tokens
+
+
+def rewrite(tokens, ratio, rnd):
+    tokens = list(tokens)
+    for _ in range(int(len(tokens) * ratio)):
+        i = rnd.randrange(len(tokens))
+        op = rnd.random()
+        if op < 0.4:
+            tokens[i] = str(rnd.randint(0, 100))
+        elif op < 0.7:
+            tokens.insert(i, rnd.choice(['|', '-', '[[', ']]', 'fc']))
+        else:
+            del tokens[i]
+    return tokens
+
+
+def run(sizes, ratio, seed):
+    rnd = random.Random(seed)
+    results = []
+    for size in sizes:
+        tokens_prev = table_tokens(max(1, size // 13), rnd)
+        tokens_curr = rewrite(tokens_prev, ratio, rnd)
+        diff = MyersBackend().compare(tokens_prev, tokens_curr)
+
+        start = default_timer()
+        expected = rescan_resolve(diff, tokens_prev, tokens_curr)
+        rescan_time = default_timer() - start
+
+        start = default_timer()
+        result = resolve(diff, tokens_curr)
+        resolve_time = default_timer() - start
+
+        assert result[0] == expected[0] and sorted(result[1]) == sorted(expected[1])
+        results.append((len(tokens_prev), len(tokens_curr), rescan_time, resolve_time))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark diff resolution of word level analysis.')
+    parser.add_argument('--tokens', type=int, nargs='+', default=[1000, 2000, 5000, 10000],
+                        help='Number of tokens in rewritten sentence.')
+    parser.add_argument('--ratio', type=float, default=0.3, help='Ratio of tokens to change.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print('{:>8} {:>8} {:>12} {:>12} {:>9}'.format('prev', 'curr', 'rescan (s)', 'resolve (s)', 'speedup'))
+    for len_prev, len_curr, rescan_time, resolve_time in run(args.tokens, args.ratio, args.seed):
+        print('{:>8} {:>8} {:>12.4f} {:>12.4f} {:>8.1f}x'.format(len_prev, len_curr, rescan_time, resolve_time,
+                                                                 rescan_time / resolve_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints of Wikiwho objects, so that analysis of an article can be continued when new revisions arrive.
+
+A checkpoint is a versioned binary file. After the header, all data is zlib compressed and stored in columns:
+words, sentences, paragraphs and revisions are written once and refer to each other by their index.
+
+Example usage:
+
+    from WikiWho import checkpoint
+
+    with open('article.wwc', 'wb') as f:
+        checkpoint.dump(wikiwho_obj, f)
+    ...
+    with open('article.wwc', 'rb') as f:
+        wikiwho_obj = checkpoint.load(f)
+    wikiwho_obj.analyse_article(new_revisions)
+
+:Authors:
+    Kenan Erdogan
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+from .structures import Word, Sentence, Paragraph, Revision, Vocabulary
+from .utils import iter_ordered, HASH_FUNCTIONS, OrderedSet
+from .wikiwho import Wikiwho
+
+
+MAGIC = b'WIKIWHO\x00'
+# 2: hash function is recorded and hash values are stored by key type of the hash function.
+# 3: values of words are stored as ids of the vocabulary.
+FORMAT_VERSION = 3
+SUPPORTED_VERSIONS = (1, 2, 3)
+_HEADER = struct.Struct('<8sH')
+_LENGTH = struct.Struct('<Q')
+_CHUNK_SIZE = 1 << 16
+
+
+class CheckpointError(Exception):
+    """Raised when a file is not a checkpoint or its format version is not supported."""
+
+
+def _ints_to_bytes(values):
+    try:
+        data = array(str('q'), values)
+    except ValueError:
+        # python 2 has no 'q' type code
+        values = list(values)
+        return struct.pack(str('<{}q').format(len(values)), *values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _ints_from_bytes(data):
+    try:
+        values = array(str('q'))
+    except ValueError:
+        return list(struct.unpack(str('<{}q').format(len(data) // 8), data))
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class _Writer(object):
+    def __init__(self, fp):
+        self.fp = fp
+        self.compressor = zlib.compressobj()
+
+    def write_bytes(self, data):
+        self.fp.write(self.compressor.compress(_LENGTH.pack(len(data))))
+        self.fp.write(self.compressor.compress(data))
+
+    def write_ints(self, values):
+        self.write_bytes(_ints_to_bytes(values))
+
+    def write_blobs(self, values):
+        """Write byte strings as offsets and concatenated data."""
+        offsets = [0]
+        size = 0
+        for value in values:
+            size += len(value)
+            offsets.append(size)
+        self.write_ints(offsets)
+        self.write_bytes(b''.join(values))
+
+    def write_strings(self, values):
+        self.write_blobs([value.encode('utf-8') for value in values])
+
+    def write_keys(self, values, key_type):
+        """Write hash values. key_type is 'str', 'bytes' or 'int', see utils.HASH_FUNCTIONS."""
+        if key_type == 'int':
+            self.write_ints(values)
+        elif key_type == 'bytes':
+            self.write_blobs(values)
+        else:
+            self.write_strings(values)
+
+    def write_lists(self, lists):
+        """Write lists of integers as offsets and flattened values."""
+        offsets = [0]
+        values = []
+        for list_ in lists:
+            values.extend(list_)
+            offsets.append(len(values))
+        self.write_ints(offsets)
+        self.write_ints(values)
+
+    def write_json(self, obj):
+        self.write_bytes(json.dumps(obj, separators=(',', ':')).encode('utf-8'))
+
+    def close(self):
+        self.fp.write(self.compressor.flush())
+
+
+class _Reader(object):
+    def __init__(self, fp):
+        self.fp = fp
+        self.decompressor = zlib.decompressobj()
+        self.buffer = bytearray()
+        self.pos = 0
+
+    def _read(self, size):
+        while len(self.buffer) - self.pos < size:
+            chunk = self.fp.read(_CHUNK_SIZE)
+            if not chunk:
+                self.buffer.extend(self.decompressor.flush())
+                if len(self.buffer) - self.pos < size:
+                    raise CheckpointError('Checkpoint is truncated.')
+                break
+            if self.pos:
+                del self.buffer[:self.pos]
+                self.pos = 0
+            self.buffer.extend(self.decompressor.decompress(chunk))
+        data = bytes(self.buffer[self.pos:self.pos + size])
+        self.pos += size
+        return data
+
+    def read_bytes(self):
+        size, = _LENGTH.unpack(self._read(_LENGTH.size))
+        return self._read(size)
+
+    def read_ints(self):
+        return _ints_from_bytes(self.read_bytes())
+
+    def read_blobs(self):
+        offsets = self.read_ints()
+        data = self.read_bytes()
+        return [data[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def read_strings(self):
+        return [value.decode('utf-8') for value in self.read_blobs()]
+
+    def read_keys(self, key_type):
+        if key_type == 'int':
+            return list(self.read_ints())
+        elif key_type == 'bytes':
+            return self.read_blobs()
+        return self.read_strings()
+
+    def read_lists(self):
+        offsets = self.read_ints()
+        values = self.read_ints()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def read_json(self):
+        return json.loads(self.read_bytes().decode('utf-8'))
+
+
+def dump(wikiwho, fp):
+    """
+    Write the complete analysis state of wikiwho into a binary file object.
+    Call this between analyses of revisions, e.g. after analyse_article returns.
+    """
+    words = wikiwho.tokens
+    word_index = {id(word): i for i, word in enumerate(words)}
+
+    # All paragraphs and sentences ever created are in hash tables, their order is kept.
+    sentences = [s for sentences_ in wikiwho.sentences_ht.values() for s in sentences_]
+    sentence_index = {id(sentence): i for i, sentence in enumerate(sentences)}
+    paragraphs = [p for paragraphs_ in wikiwho.paragraphs_ht.values() for p in paragraphs_]
+    paragraph_index = {id(paragraph): i for i, paragraph in enumerate(paragraphs)}
+
+    revisions = list(wikiwho.revisions.values())
+    revision_index = {id(revision): i for i, revision in enumerate(revisions)}
+    for revision in (wikiwho.revision_curr, wikiwho.revision_prev):
+        # ex: initial empty revision
+        if revision is not None and id(revision) not in revision_index:
+            revision_index[id(revision)] = len(revisions)
+            revisions.append(revision)
+
+    key_type = HASH_FUNCTIONS[wikiwho.hash_function][1]
+
+    fp.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+    writer = _Writer(fp)
+    writer.write_json({
+        'title': wikiwho.title,
+        'page_id': wikiwho.page_id,
+        'token_id': wikiwho.token_id,
+        'rvcontinue': wikiwho.rvcontinue,
+        'spam_ids': wikiwho.spam_ids.to_list(),
+        'spam_hashes': wikiwho.spam_hashes.to_list(),
+        'spam_limit': wikiwho.spam_limit,
+        'ordered_revisions': wikiwho.ordered_revisions,
+        'revisions': len(wikiwho.revisions),
+        'keep_revisions': wikiwho.keep_revisions,
+        'hash_function': wikiwho.hash_function,
+        'revision_curr': revision_index[id(wikiwho.revision_curr)],
+        'revision_prev': None if wikiwho.revision_prev is None else revision_index[id(wikiwho.revision_prev)],
+    })
+
+    # words of an article use a few distinct values, each is written once
+    vocabulary = wikiwho.vocabulary
+    value_ids = [vocabulary.add(word.value) for word in words]
+    writer.write_ints([word.token_id for word in words])
+    writer.write_strings(vocabulary.values)
+    writer.write_ints(value_ids)
+    writer.write_ints([word.origin_rev_id for word in words])
+    writer.write_ints([word.last_rev_id for word in words])
+    writer.write_lists([word.outbound for word in words])
+    writer.write_lists([word.inbound for word in words])
+
+    writer.write_keys([sentence.hash_value for sentence in sentences], key_type)
+    writer.write_lists([[word_index[id(word)] for word in sentence.words] for sentence in sentences])
+
+    writer.write_keys([paragraph.hash_value for paragraph in paragraphs], key_type)
+    writer.write_lists([[sentence_index[id(sentence)]
+                         for sentence in iter_ordered(paragraph.ordered_sentences, paragraph.sentences)]
+                        for paragraph in paragraphs])
+
+    writer.write_json([[revision.id, revision.editor, revision.timestamp, revision.length, revision.original_adds]
+                       for revision in revisions])
+    writer.write_lists([[paragraph_index[id(paragraph)]
+                         for paragraph in iter_ordered(revision.ordered_paragraphs, revision.paragraphs)]
+                        for revision in revisions])
+    writer.close()
+
+
+def load(fp, **kwargs):
+    """
+    Read a checkpoint written by dump.
+    :param fp: Binary file object.
+    :param kwargs: Extra arguments for Wikiwho, e.g. diff_backend. keep_revisions, hash_function and spam_limit
+    are taken from checkpoint if not given.
+    :return: Wikiwho object which can continue analysing the article from the next revision.
+    """
+    magic, version = _HEADER.unpack(fp.read(_HEADER.size))
+    if magic != MAGIC:
+        raise CheckpointError('Not a WikiWho checkpoint.')
+    if version not in SUPPORTED_VERSIONS:
+        raise CheckpointError('Unsupported checkpoint format version: {}'.format(version))
+    reader = _Reader(fp)
+    meta = reader.read_json()
+
+    kwargs.setdefault('keep_revisions', meta.get('keep_revisions', True))
+    kwargs.setdefault('spam_limit', meta.get('spam_limit'))
+    # hash values in checkpoint can only be extended with the same hash function
+    hash_function = meta.get('hash_function', 'md5')
+    if kwargs.get('hash_function') not in (None, hash_function):
+        raise CheckpointError('Checkpoint is created with {} hash function.'.format(hash_function))
+    kwargs['hash_function'] = hash_function
+    key_type = HASH_FUNCTIONS[hash_function][1]
+    wikiwho = Wikiwho(meta['title'], **kwargs)
+    wikiwho.page_id = meta['page_id']
+    wikiwho.token_id = meta['token_id']
+    wikiwho.rvcontinue = meta['rvcontinue']
+    wikiwho.spam_ids = OrderedSet(meta['spam_ids'], wikiwho.spam_limit)
+    wikiwho.spam_hashes = OrderedSet(meta['spam_hashes'], wikiwho.spam_limit)
+    wikiwho.ordered_revisions = meta['ordered_revisions']
+
+    token_ids = reader.read_ints()
+    if version >= 3:
+        vocabulary = Vocabulary(reader.read_strings())
+        values = [vocabulary.values[i] for i in reader.read_ints()]
+    else:
+        vocabulary = Vocabulary()
+        values = [vocabulary.intern(value) for value in reader.read_strings()]
+    wikiwho.vocabulary = vocabulary
+    words = []
+    for token_id, value, origin_rev_id, last_rev_id, outbound, inbound in zip(
+            token_ids, values, reader.read_ints(), reader.read_ints(), reader.read_lists(), reader.read_lists()):
+        word = Word()
+        word.token_id = token_id
+        word.value = value
+        word.origin_rev_id = origin_rev_id
+        word.last_rev_id = last_rev_id
+        for rev_id in outbound:
+            word.add_outbound(rev_id)
+        for rev_id in inbound:
+            word.add_inbound(rev_id)
+        words.append(word)
+    wikiwho.tokens = words
+
+    sentences = []
+    for hash_value, word_indices in zip(reader.read_keys(key_type), reader.read_lists()):
+        sentence = Sentence()
+        sentence.hash_value = hash_value
+        sentence.words = [words[i] for i in word_indices]
+        sentence.splitted = None
+        sentences.append(sentence)
+        wikiwho.sentences_ht.setdefault(hash_value, []).append(sentence)
+
+    paragraphs = []
+    for hash_value, sentence_indices in zip(reader.read_keys(key_type), reader.read_lists()):
+        paragraph = Paragraph()
+        paragraph.hash_value = hash_value
+        for i in sentence_indices:
+            sentence = sentences[i]
+            paragraph.sentences.setdefault(sentence.hash_value, []).append(sentence)
+            paragraph.ordered_sentences.append(sentence.hash_value)
+        paragraphs.append(paragraph)
+        wikiwho.paragraphs_ht.setdefault(hash_value, []).append(paragraph)
+
+    revisions = []
+    for (rev_id, editor, timestamp, length, original_adds), paragraph_indices in zip(
+            reader.read_json(), reader.read_lists()):
+        revision = Revision()
+        revision.id = rev_id
+        revision.editor = editor
+        revision.timestamp = timestamp
+        revision.length = length
+        revision.original_adds = original_adds
+        for i in paragraph_indices:
+            paragraph = paragraphs[i]
+            revision.paragraphs.setdefault(paragraph.hash_value, []).append(paragraph)
+            revision.ordered_paragraphs.append(paragraph.hash_value)
+        revisions.append(revision)
+    for revision in revisions[:meta['revisions']]:
+        wikiwho.revisions[revision.id] = revision
+
+    wikiwho.revision_curr = revisions[meta['revision_curr']]
+    wikiwho.revision_prev = None if meta['revision_prev'] is None else revisions[meta['revision_prev']]
+    return wikiwho
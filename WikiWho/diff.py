@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Token diff backends used in word level analysis.
+
+A backend compares the unmatched tokens of the previous revision with the tokens of the current revision and
+returns an ordered list of (tag, token) tuples. Tags are the codes of difflib.Differ: EQUAL (' '),
+DELETE ('-') and INSERT ('+'). Intraline '?' hints are never produced.
+Backends can report how the last diff was done in `guarded` and `fallbacks` attributes (see GuardedBackend),
+which are recorded in RevisionStats.
+
+:Authors:
+    Maribel Acosta,
+    Fabian Floeck,
+    Kenan Erdogan
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from bisect import bisect_left
+from collections import deque
+from difflib import Differ
+
+
+EQUAL = ' '
+DELETE = '-'
+INSERT = '+'
+# Default budget of GuardedBackend: product of the numbers of previous and current tokens which are diffed at once.
+# Differ is roughly cubic on many similar tokens (e.g. reformatted tables and link lists): 400 x 400 of them take
+# seconds, 200 x 200 a fraction of a second.
+MAX_DIFF_COST = 40000
+
+
+class DiffMismatchError(Exception):
+    """Raised by a strict CheckBackend when a backend resolves tokens differently than difflib.Differ."""
+
+
+class DifferBackend(object):
+    """Reference backend. This is the original diff of WikiWho, it is roughly quadratic."""
+    name = 'differ'
+
+    def compare(self, tokens_prev, tokens_curr):
+        diff = []
+        for line in Differ().compare(tokens_prev, tokens_curr):
+            tag = line[0]
+            if tag != '?':
+                diff.append((tag, line[2:]))
+        return diff
+
+
+class MyersBackend(object):
+    """
+    Linear space variant of Myers' O(ND) diff algorithm.
+    Common prefix and suffix are stripped before each divide and conquer step.
+    """
+    name = 'myers'
+
+    def compare(self, tokens_prev, tokens_curr):
+        diff = []
+        _myers(tokens_prev, 0, len(tokens_prev), tokens_curr, 0, len(tokens_curr), diff)
+        return diff
+
+
+class CheckBackend(object):
+    """
+    Test mode: runs the given backend and the Differ backend side by side and compares which previous tokens
+    each current token is resolved to, which is what determines the authorship.
+    The result of Differ is returned so that the analysis output stays the same as with the Differ backend.
+    """
+    name = 'check'
+
+    def __init__(self, backend=None, strict=False):
+        self.backend = backend or MyersBackend()
+        self.reference = DifferBackend()
+        self.strict = strict
+        self.compared = 0  # Number of compared diffs.
+        self.mismatches = []  # [(tokens_prev, tokens_curr), ..] inputs which are resolved differently.
+
+    def compare(self, tokens_prev, tokens_curr):
+        diff = self.backend.compare(tokens_prev, tokens_curr)
+        diff_reference = self.reference.compare(tokens_prev, tokens_curr)
+        self.compared += 1
+        if resolve(diff, tokens_curr) != resolve(diff_reference, tokens_curr):
+            if self.strict:
+                raise DiffMismatchError('{} backend resolves tokens differently than differ backend.'.
+                                        format(self.backend.name))
+            self.mismatches.append((tokens_prev, tokens_curr))
+        return diff_reference
+
+
+class GuardedBackend(object):
+    """
+    Guard against huge diffs, e.g. of mass reformatting, bot rewrites or restored blankings, which can take minutes.
+    Diffs within the budget (number of previous tokens * number of current tokens <= max_cost) are done by the
+    given backend as they are. Larger ones are split at anchors, tokens which occur exactly once in both token
+    lists (as in patience diff), and the pieces between anchors are diffed separately, recursively. Pieces over the
+    budget without any anchor fall back to matching their common prefix and suffix, the rest is deleted and
+    inserted.
+    The budget is a size, not a time, so that results do not depend on the machine.
+    After each compare, guarded tells if the diff was over the budget and fallbacks the number of pieces which fell
+    back.
+    """
+    name = 'guarded'
+
+    def __init__(self, backend=None, max_cost=MAX_DIFF_COST):
+        self.backend = backend or DifferBackend()
+        self.max_cost = max_cost
+        self.guarded = False
+        self.fallbacks = 0
+
+    def compare(self, tokens_prev, tokens_curr):
+        self.fallbacks = 0
+        self.guarded = len(tokens_prev) * len(tokens_curr) > self.max_cost
+        if not self.guarded:
+            return self.backend.compare(tokens_prev, tokens_curr)
+        diff = []
+        self._compare(tokens_prev, 0, len(tokens_prev), tokens_curr, 0, len(tokens_curr), diff)
+        return diff
+
+    def _compare(self, a, alo, ahi, b, blo, bhi, diff):
+        # Common prefix.
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            diff.append((EQUAL, a[alo]))
+            alo += 1
+            blo += 1
+        # Common suffix.
+        suffix_end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+
+        if (ahi - alo) * (bhi - blo) <= self.max_cost:
+            if alo < ahi or blo < bhi:
+                diff.extend(self.backend.compare(a[alo:ahi], b[blo:bhi]))
+        else:
+            anchors = _anchors(a, alo, ahi, b, blo, bhi)
+            if anchors:
+                for i, j in anchors:
+                    self._compare(a, alo, i, b, blo, j, diff)
+                    diff.append((EQUAL, a[i]))
+                    alo = i + 1
+                    blo = j + 1
+                self._compare(a, alo, ahi, b, blo, bhi, diff)
+            else:
+                self.fallbacks += 1
+                for i in range(alo, ahi):
+                    diff.append((DELETE, a[i]))
+                for j in range(blo, bhi):
+                    diff.append((INSERT, b[j]))
+
+        for i in range(ahi, suffix_end):
+            diff.append((EQUAL, a[i]))
+
+
+BACKENDS = {
+    DifferBackend.name: DifferBackend,
+    MyersBackend.name: MyersBackend,
+    CheckBackend.name: CheckBackend,
+    GuardedBackend.name: GuardedBackend,
+}
+
+
+def get_backend(backend=None):
+    """
+    :param backend: None (differ), name of a backend in BACKENDS or an object with a compare method.
+    :return: Diff backend object.
+    """
+    if backend is None:
+        return DifferBackend()
+    if hasattr(backend, 'compare'):
+        return backend
+    try:
+        return BACKENDS[backend]()
+    except KeyError:
+        raise ValueError('Unknown diff backend: {}. Choices are: {}'.format(backend, ', '.join(sorted(BACKENDS))))
+
+
+def resolve(diff, tokens_curr):
+    """
+    Resolve diff output the way word level analysis does: each current token takes the first not consumed diff
+    entry with the same value, deleted entries before it are consumed on the way.
+    :return: Tuple of previous token position (or None if token is new) for each current token and
+    list of previous token positions which are marked as deleted.
+    """
+    entries = {}  # {token: deque([(tag, position in previous tokens), ..])}
+    pos_prev = 0
+    for tag, token in diff:
+        if tag == INSERT:
+            entries.setdefault(token, deque()).append((tag, None))
+        else:
+            entries.setdefault(token, deque()).append((tag, pos_prev))
+            pos_prev += 1
+
+    matches = []
+    deleted = []
+    for token in tokens_curr:
+        match = None
+        queue = entries.get(token)
+        while queue:
+            tag, pos = queue.popleft()
+            if tag == DELETE:
+                deleted.append(pos)
+                continue
+            match = pos  # None if tag is INSERT
+            break
+        matches.append(match)
+    return tuple(matches), deleted
+
+
+def _anchors(a, alo, ahi, b, blo, bhi):
+    """
+    Find tokens which occur exactly once in a[alo:ahi] and exactly once in b[blo:bhi]. Of their position pairs, the
+    longest sequence which is in the same order in both lists is chosen by patience sorting.
+    :return: Ordered list of position pairs (i, j) with a[i] == b[j].
+    """
+    positions_a = {}  # {token: position in a or None if it is not unique}
+    for i in range(alo, ahi):
+        token = a[i]
+        positions_a[token] = None if token in positions_a else i
+    positions_b = {}
+    for j in range(blo, bhi):
+        token = b[j]
+        if positions_a.get(token) is not None:
+            positions_b[token] = None if token in positions_b else j
+    pairs = sorted((positions_a[token], j) for token, j in positions_b.items() if j is not None)
+
+    # Longest increasing sequence of positions in b.
+    tails = []  # tails[k]: index in pairs of the last pair of the best sequence of length k + 1 found so far
+    tails_b = []  # positions in b of tails
+    previous = [None] * len(pairs)  # index of the previous pair in the sequence
+    for n, (_, j) in enumerate(pairs):
+        k = bisect_left(tails_b, j)
+        if k:
+            previous[n] = tails[k - 1]
+        if k == len(tails):
+            tails.append(n)
+            tails_b.append(j)
+        else:
+            tails[k] = n
+            tails_b[k] = j
+    anchors = []
+    n = tails[-1] if tails else None
+    while n is not None:
+        anchors.append(pairs[n])
+        n = previous[n]
+    anchors.reverse()
+    return anchors
+
+
+def _myers(a, alo, ahi, b, blo, bhi, diff):
+    # Common prefix.
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        diff.append((EQUAL, a[alo]))
+        alo += 1
+        blo += 1
+    # Common suffix.
+    suffix_end = ahi
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+
+    if alo == ahi:
+        for j in range(blo, bhi):
+            diff.append((INSERT, b[j]))
+    elif blo == bhi:
+        for i in range(alo, ahi):
+            diff.append((DELETE, a[i]))
+    else:
+        x, y, u, v = _middle_snake(a, alo, ahi, b, blo, bhi)
+        _myers(a, alo, x, b, blo, y, diff)
+        for i in range(x, u):
+            diff.append((EQUAL, a[i]))
+        _myers(a, u, ahi, b, v, bhi, diff)
+
+    for i in range(ahi, suffix_end):
+        diff.append((EQUAL, a[i]))
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi):
+    """
+    Find the middle snake of the shortest edit script of a[alo:ahi] and b[blo:bhi] by running the greedy
+    algorithm forward and backward at the same time.
+    :return: Start and end points of the snake: (x, y, u, v).
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta % 2 == 1
+    offset = (n + m + 1) // 2 + 1
+    forward = [0] * (2 * offset + 1)  # furthest reaching x on diagonal k: forward[offset + k]
+    backward = [0] * (2 * offset + 1)  # same for reversed sequences
+    for d in range(offset):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and delta - d < k < delta + d and x + backward[offset + delta - k] >= n:
+                return alo + x_start, blo + y_start, alo + x, blo + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return ahi - x, bhi - y, ahi - x_start, bhi - y_start
+    raise AssertionError('middle snake not found')  # unreachable
@@ -1,9 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from WikiWho.wikiwho import Wikiwho
 
+API_URL = 'https://en.wikipedia.org/w/api.php'
+USER_AGENT = 'WikiWho (https://github.com/wikiwho/WikiWho)'
+# Responses which are worth to retry: http status codes and api error codes.
+RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_ERRORS = ('maxlag', 'ratelimited', 'readonly', 'internal_api_error_DBQueryError')
+
+
+class ApiError(Exception):
+    pass
+
+
+def create_session(pool_size=10):
+    """
+    Session which keeps up to pool_size connections per host open, so batches are fetched without new
+    connections. Share one session between articles which are processed in threads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def request_api(session, url, params, retries=5, backoff=1.0, timeout=60):
+    """
+    GET request to the api. Connection errors, timeouts, http status codes in RETRY_STATUS and api errors in
+    RETRY_ERRORS are retried after backoff * 2 ** attempt seconds or after the time in Retry-After header.
+    :return: Json response.
+    """
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+            if response.status_code in RETRY_STATUS:
+                error = 'HTTP {}'.format(response.status_code)
+                retry_after = response.headers.get('Retry-After')
+            else:
+                response.raise_for_status()
+                result = response.json()
+                if 'error' not in result:
+                    return result
+                if result['error'].get('code') not in RETRY_ERRORS:
+                    raise ApiError('Wikipedia API returned the following error:' + str(result['error']))
+                error = result['error']
+                retry_after = response.headers.get('Retry-After')
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt >= retries:
+            raise ApiError('Wikipedia API request failed after {} retries: {}'.format(retries, error))
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = backoff * 2 ** attempt
+        time.sleep(delay)
+        attempt += 1
+
+
+def iter_api_batches(page_id, url=API_URL, session=None, rvcontinue=None, prefetch=True, rvstartid=None,
+                     **request_kwargs):
+    """
+    Follow continuation of the api through the revision history of the page.
+    While a batch is being processed, the next one is fetched in background if prefetch is True.
+    :param page_id: Page id of the article.
+    :param url: Url of the api, e.g. of another wiki or of a local server.
+    :param session: requests session (see create_session). A new one is created if None.
+    :param rvcontinue: Continue from this point of the history instead of from the first revision.
+    :param rvstartid: Start from the revision with this id (including it) instead of from the first revision.
+    :param request_kwargs: Extra arguments for request_api (retries, backoff, timeout).
+    :return: Generator of (page, revisions, rvcontinue). page is the page dict of api response and rvcontinue is
+    the continuation of the next batch (None after the last batch).
+    """
+    # you can check here for the explanation of the api call
+    # https://www.mediawiki.org/wiki/API:Revisions
+    params = {'pageids': page_id, 'action': 'query', 'prop': 'revisions',
+              'rvprop': 'content|ids|timestamp|sha1|comment|flags|user|userid',
+              'rvlimit': 'max', 'format': 'json', 'continue': '', 'rvdir': 'newer'}
+    if rvcontinue:
+        params['rvcontinue'] = rvcontinue
+    elif rvstartid:
+        params['rvstartid'] = rvstartid
+    session = session or create_session(pool_size=1)
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        result = request_api(session, url, params, **request_kwargs)
+        while True:
+            pages = result['query']['pages']
+            if '-1' in pages:
+                raise ApiError('The article ({}) you are trying to request does not exist!'.format(page_id))
+            _, page = pages.popitem()
+            if 'missing' in page:
+                raise ApiError('The article ({}) you are trying to request does not exist!'.format(page_id))
+            continue_params = result.get('continue')
+
+            next_result = None
+            if continue_params:
+                params = dict(params, **continue_params)
+                if executor:
+                    next_result = executor.submit(request_api, session, url, params, **request_kwargs)
+
+            yield page, page.pop('revisions', []), continue_params and continue_params.get('rvcontinue')
+
+            if not continue_params:
+                break
+            result = next_result.result() if next_result else request_api(session, url, params, **request_kwargs)
+    finally:
+        if executor:
+            executor.shutdown(wait=True)
 
-def process_api_output(page_id):
+
+def process_api_output(page_id, url=API_URL, session=None, wikiwho=None, callback=None, prefetch=True,
+                       **request_kwargs):
     """
     Example usage:
 
@@ -17,30 +133,52 @@ def process_api_output(page_id):
     for token in iter_rev_tokens(wikiwho_obj.revisions[wikiwho_obj.ordered_revisions[0]]):
         print(token.value, token.token_id, token.origin_rev_id)
 
+    Revisions are analysed batch by batch through the whole history, the next batch is fetched while the current
+    one is analysed.
+
     :param page_id: Page id of the article which is  going to be analysed.
-    :return: WikiWho object.
+    :param url: Url of the api.
+    :param session: requests session, see create_session.
+    :param wikiwho: WikiWho object to continue, e.g. loaded from a checkpoint. Fetching continues from its last
+    analysed revision, so revisions which are made after a previous call are analysed too. If it has not analysed
+    any revision yet, fetching continues from its rvcontinue.
+    :param callback: Optional function which is called with a RevisionResult after each accepted revision.
+    :param request_kwargs: Extra arguments for request_api (retries, backoff, timeout).
+    :return: WikiWho object. Its rvcontinue is None if the whole history (at the time of the call) is analysed.
     """
-    # you can check here for the explanation of the api call
-    # https://www.mediawiki.org/wiki/API:Revisions
-    url = 'https://en.wikipedia.org/w/api.php'
-    params = {'pageids': page_id, 'action': 'query', 'prop': 'revisions',
-              'rvprop': 'content|ids|timestamp|sha1|comment|flags|user|userid',
-              'rvlimit': 'max', 'format': 'json', 'continue': '', 'rvdir': 'newer'}
-
-    # gets only first 50 revisions of given page
-    result = requests.get(url=url, params=params).json()
-    if 'error' in result:
-        raise Exception('Wikipedia API returned the following error:' + str(result['error']))
+    rvcontinue = None
+    rvstartid = None
+    analysed = set()
+    if wikiwho is not None:
+        if wikiwho.ordered_revisions:
+            # The last analysed revision is fetched again, because rvstartid includes it. Revisions which are
+            # already analysed (e.g. if the previous call failed in the middle of a batch) are skipped below.
+            rvstartid = wikiwho.ordered_revisions[-1]
+            analysed = set(wikiwho.ordered_revisions)
+        elif wikiwho.rvcontinue not in (None, '0'):
+            rvcontinue = wikiwho.rvcontinue
+    batches = iter_api_batches(page_id, url, session, rvcontinue, prefetch, rvstartid, **request_kwargs)
+    page, revisions, rvcontinue = next(batches)
+    if wikiwho is None:
+        wikiwho = Wikiwho(page['title'])
+    wikiwho.page_id = page['pageid']
+    spam_ids = wikiwho.spam_ids
 
-    pages = result['query']['pages']
-    if "-1" in pages:
-        raise Exception('The article ({}) you are trying to request does not exist!'.format(page_id))
+    def iter_batch(batch):
+        for revision in batch:
+            rev_id = int(revision['revid'])
+            if rev_id not in analysed and rev_id not in spam_ids:
+                yield revision
 
-    _, page = result['query']['pages'].popitem()
-    if 'missing' in page:
-        raise Exception('The article ({}) you are trying to request does not exist!'.format(page_id))
+    def iter_revisions():
+        for revision in iter_batch(revisions):
+            yield revision
+        # rvcontinue is updated after all revisions of the batch are analysed
+        wikiwho.rvcontinue = rvcontinue
+        for _, batch, next_rvcontinue in batches:
+            for revision in iter_batch(batch):
+                yield revision
+            wikiwho.rvcontinue = next_rvcontinue
 
-    wikiwho = Wikiwho(page['title'])
-    wikiwho.analyse_article(page.get('revisions', []))
-    wikiwho.rvcontinue = result['continue']['rvcontinue']
+    wikiwho.analyse_article(iter_revisions(), callback)
     return wikiwho
@@ -1,8 +1,21 @@
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from multiprocessing import Pipe, Process, cpu_count
+from multiprocessing.connection import wait
+from timeit import default_timer
+
 from mwxml import Dump
 from mwtypes.files import reader
 
+from WikiWho import checkpoint
 from WikiWho.wikiwho import Wikiwho
 
+# Default timeout of the analysis of a page in process_xml_dumps, in seconds.
+PAGE_TIMEOUT = 6 * 3600
+
 
 def process_xml_dump(xml_file_path):
     """
@@ -27,3 +40,180 @@ def process_xml_dump(xml_file_path):
         wikiwho.analyse_article_from_xml_dump(page)
         break  # process only first page
     return wikiwho
+
+
+def write_checkpoint(wikiwho, output_dir):
+    """
+    Default writer of process_xml_dumps. Writes analysis of the page into output_dir/<page_id>.wwc
+    :return: Path of the checkpoint.
+    """
+    path = os.path.join(output_dir, '{}.wwc'.format(wikiwho.page_id))
+    with open(path, 'wb') as f:
+        checkpoint.dump(wikiwho, f)
+    return path
+
+
+def _spool_page(page, spool_dir):
+    """Write revisions of the page into a temporary file, so that the main process never holds a whole page."""
+    fd, path = tempfile.mkstemp(prefix='{}-'.format(page.id), dir=spool_dir)
+    size = 0
+    revisions = 0
+    with os.fdopen(fd, 'wb') as f:
+        for revision in page:
+            pickle.dump(revision, f, pickle.HIGHEST_PROTOCOL)
+            size += len(revision.text or '')
+            revisions += 1
+    return size, page.id, page.title, revisions, path
+
+
+def _iter_spooled_revisions(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _limit_memory(max_memory):
+    if max_memory:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+
+
+def _result(task, error=None):
+    size, page_id, title, revisions, _ = task
+    return {'page_id': page_id, 'title': title, 'revisions': revisions, 'size': size,
+            'tokens': None, 'output': None, 'error': error, 'seconds': None}
+
+
+def _analyse_page(task, output_dir, writer):
+    """Runs in a worker process. Only a small summary is sent back, not the Wikiwho object."""
+    path = task[4]
+    start = default_timer()
+    result = _result(task)
+    try:
+        wikiwho = Wikiwho(task[2])
+        wikiwho.page_id = task[1]
+        wikiwho.analyse_article_from_xml_dump(_iter_spooled_revisions(path))
+        result['tokens'] = len(wikiwho.tokens)
+        result['output'] = writer(wikiwho, output_dir)
+    except Exception as e:
+        # MemoryError if page doesn't fit into max_memory
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    finally:
+        _remove_spooled(path)
+    result['seconds'] = default_timer() - start
+    return result
+
+
+def _remove_spooled(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _run_page(task, output_dir, writer, max_memory, connection):
+    """Target of the worker process of a page. Sends the result of _analyse_page to the main process."""
+    _limit_memory(max_memory)
+    connection.send(_analyse_page(task, output_dir, writer))
+    connection.close()
+
+
+def process_xml_dumps(xml_file_paths, output_dir, processes=None, lookahead=None, max_memory=None,
+                      writer=write_checkpoint, spool_dir=None, timeout=PAGE_TIMEOUT):
+    """
+    Analyse every page of xml dumps in parallel worker processes.
+
+    Pages are read by the main process and spooled into temporary files, up to `lookahead` pages ahead of the
+    workers. Whenever a worker is free, the largest spooled page is analysed next. Each page is analysed in its own
+    process, which writes the result itself (see write_checkpoint), so Wikiwho objects are never sent between
+    processes and a worker which does not finish in time can be killed.
+
+    A page whose id was already read from an earlier dump (or earlier in the same dump) is not analysed again,
+    because its output would overwrite the first one. It is reported with an error in result['error'].
+
+    Example usage:
+
+    from WikiWho.examples.process_xml_dump import process_xml_dumps
+
+    xml_file_paths = ['/home/kenan/Downloads/enwiki-20180101-pages-meta-history1.xml-p5753p7728.7z']
+    for result in process_xml_dumps(xml_file_paths, '/tmp/wikiwho', processes=32, max_memory=8 * 1024 ** 3):
+        print(result['page_id'], result['title'], result['seconds'], result['error'])
+
+    :param xml_file_paths: List of xml dump file paths.
+    :param output_dir: Directory where writer writes results.
+    :param processes: Number of worker processes. Default is number of cpus.
+    :param lookahead: Maximum number of spooled pages waiting for a worker. Default is 2 * processes.
+    :param max_memory: Maximum address space of a worker in bytes. Analysis of a page which needs more fails with
+    MemoryError and is reported in result['error'].
+    :param writer: Function which is called with (wikiwho, output_dir) in the worker. It must be picklable.
+    :param spool_dir: Parent directory for spooled pages. Default is the system temporary directory.
+    :param timeout: Seconds after the start of its worker after which the analysis of a page is reported as failed
+    and its worker is killed. None to wait forever. A worker which is killed by others (e.g. by the OOM killer) is
+    reported as failed as soon as it exits.
+    :return: Generator of result dicts of pages in order of completion.
+    """
+    processes = processes or cpu_count()
+    lookahead = lookahead or 2 * processes
+    spool_dir = tempfile.mkdtemp(prefix='wikiwho-', dir=spool_dir)
+    pages = (page for xml_file_path in xml_file_paths for page in Dump.from_file(reader(xml_file_path)))
+    pages_left = True
+    spooled = []  # heap of spooled pages, largest first
+    page_ids = set()  # ids of pages read so far
+    running = {}  # {connection: (process, deadline, task)} of workers
+
+    try:
+        while True:
+            while pages_left and len(spooled) < lookahead:
+                page = next(pages, None)
+                if page is None:
+                    pages_left = False
+                elif page.id in page_ids:
+                    yield _result((None, page.id, page.title, None, None),
+                                  'Duplicate page: page {} is already read from dumps.'.format(page.id))
+                else:
+                    page_ids.add(page.id)
+                    task = _spool_page(page, spool_dir)
+                    heapq.heappush(spooled, (-task[0], task[1], task))
+            while spooled and len(running) < processes:
+                task = heapq.heappop(spooled)[2]
+                connection, worker_connection = Pipe(duplex=False)
+                process = Process(target=_run_page, args=(task, output_dir, writer, max_memory, worker_connection))
+                process.start()
+                # only the worker keeps its end open, so the connection is closed when the worker exits
+                worker_connection.close()
+                running[connection] = (process, default_timer() + timeout if timeout is not None else None, task)
+            if not running:
+                break
+            deadlines = [deadline for _, deadline, _ in running.values() if deadline is not None]
+            ready = wait(list(running), max(0, min(deadlines) - default_timer()) if deadlines else None)
+            for connection in ready:
+                process, _, task = running.pop(connection)
+                try:
+                    result = connection.recv()
+                except EOFError:
+                    # the worker exited without result, e.g. it was killed
+                    process.join()
+                    result = _result(task, 'Worker exited with code {}.'.format(process.exitcode))
+                connection.close()
+                process.join()
+                _remove_spooled(task[4])
+                yield result
+            if not ready:
+                now = default_timer()
+                for connection, (process, deadline, task) in list(running.items()):
+                    if deadline is not None and deadline <= now:
+                        del running[connection]
+                        process.terminate()
+                        process.join()
+                        connection.close()
+                        _remove_spooled(task[4])
+                        yield _result(task, 'Timeout: analysis took more than {} s.'.format(timeout))
+    finally:
+        for connection, (process, _, _) in running.items():
+            process.terminate()
+            process.join()
+            connection.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
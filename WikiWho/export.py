@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk export of tokens and revisions of an analysed article for analytics.
+
+Tokens and revisions are exported as columns, which refer to each other by token and revision ids (to_dict of
+structures refer to objects by memory address). Columns are built or written directly from Wikiwho.tokens and
+Wikiwho.revisions, one token or revision at a time.
+
+Token columns: token_id, value, origin_rev_id, last_rev_id, inbound_offsets, inbound, outbound_offsets, outbound.
+Inbound and outbound revision ids of all tokens are flattened, those of the nth token are
+inbound[inbound_offsets[n]:inbound_offsets[n + 1]].
+Revision columns: rev_id, editor, timestamp, length, original_adds, in order of analysis. If keep_revisions is
+False, only the last revision is in Wikiwho.revisions.
+
+Example usage:
+
+    from WikiWho import export
+
+    columns = export.token_columns(wikiwho)
+    arrays = export.to_numpy(columns)  # needs numpy, ex: numpy.savez('tokens.npz', **arrays)
+
+    with io.open('tokens.csv', 'w', encoding='utf-8', newline='') as f:
+        export.write_tokens_csv(wikiwho, f)
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import csv
+from array import array
+from collections import OrderedDict
+
+# Type code of integer columns: 64 bits.
+try:
+    TYPECODE = str('q')
+    array(TYPECODE)
+except ValueError:
+    # python 2 has no 'q' type code, 'l' is 64 bits on most 64 bit platforms, but 32 bits on windows
+    TYPECODE = str('l')
+TOKEN_COLUMNS = ('token_id', 'value', 'origin_rev_id', 'last_rev_id',
+                 'inbound_offsets', 'inbound', 'outbound_offsets', 'outbound')
+REVISION_COLUMNS = ('rev_id', 'editor', 'timestamp', 'length', 'original_adds')
+# Columns with text values, others are integers.
+TEXT_COLUMNS = ('value', 'editor', 'timestamp')
+
+
+def iter_revisions(wikiwho):
+    """Yield analysed revisions which are kept in wikiwho.revisions in order."""
+    for rev_id in wikiwho.ordered_revisions:
+        revision = wikiwho.revisions.get(rev_id)
+        if revision is not None:
+            yield revision
+
+
+def token_columns(wikiwho):
+    """:return: OrderedDict of token columns (see TOKEN_COLUMNS). Integer columns are arrays, value is a list."""
+    columns = OrderedDict((name, [] if name in TEXT_COLUMNS else array(TYPECODE)) for name in TOKEN_COLUMNS)
+    token_ids = columns['token_id']
+    values = columns['value']
+    origin_rev_ids = columns['origin_rev_id']
+    last_rev_ids = columns['last_rev_id']
+    inbound_offsets = columns['inbound_offsets']
+    inbound = columns['inbound']
+    outbound_offsets = columns['outbound_offsets']
+    outbound = columns['outbound']
+    inbound_offsets.append(0)
+    outbound_offsets.append(0)
+    for word in wikiwho.tokens:
+        token_ids.append(word.token_id)
+        values.append(word.value)
+        origin_rev_ids.append(word.origin_rev_id)
+        last_rev_ids.append(word.last_rev_id)
+        if word.inbound:
+            inbound.extend(word.inbound)
+        inbound_offsets.append(len(inbound))
+        if word.outbound:
+            outbound.extend(word.outbound)
+        outbound_offsets.append(len(outbound))
+    return columns
+
+
+def revision_columns(wikiwho):
+    """:return: OrderedDict of revision columns (see REVISION_COLUMNS). Integer columns are arrays."""
+    columns = OrderedDict((name, [] if name in TEXT_COLUMNS else array(TYPECODE)) for name in REVISION_COLUMNS)
+    for revision in iter_revisions(wikiwho):
+        columns['rev_id'].append(revision.id)
+        columns['editor'].append(revision.editor)
+        columns['timestamp'].append(revision.timestamp)
+        columns['length'].append(revision.length)
+        columns['original_adds'].append(revision.original_adds)
+    return columns
+
+
+def to_numpy(columns):
+    """
+    Convert columns of token_columns or revision_columns into numpy arrays. Needs numpy.
+    Integer columns are int64 arrays (int32 if TYPECODE has 32 bits) which share memory with the given columns,
+    text columns are object arrays.
+    """
+    import numpy
+    dtype = numpy.dtype(str('i{}').format(array(TYPECODE).itemsize))
+    arrays = OrderedDict()
+    for name, values in columns.items():
+        if name in TEXT_COLUMNS:
+            arrays[name] = numpy.array(values, dtype=object)
+        elif values:
+            arrays[name] = numpy.frombuffer(values, dtype=dtype)
+        else:
+            # frombuffer does not accept empty buffers in old numpy versions
+            arrays[name] = numpy.zeros(0, dtype=dtype)
+    return arrays
+
+
+def write_tokens_csv(wikiwho, fp):
+    """
+    Write tokens as csv with a header row: token_id, value, origin_rev_id, last_rev_id, inbound, outbound.
+    Inbound and outbound revision ids of a token are separated by spaces.
+    :param fp: Text file object opened with newline=''.
+    """
+    writer = csv.writer(fp)
+    writer.writerow(('token_id', 'value', 'origin_rev_id', 'last_rev_id', 'inbound', 'outbound'))
+    for word in wikiwho.tokens:
+        writer.writerow((word.token_id, word.value, word.origin_rev_id, word.last_rev_id,
+                         ' '.join(str(rev_id) for rev_id in word.inbound),
+                         ' '.join(str(rev_id) for rev_id in word.outbound)))
+
+
+def write_revisions_csv(wikiwho, fp):
+    """
+    Write revisions as csv with a header row (see REVISION_COLUMNS).
+    :param fp: Text file object opened with newline=''.
+    """
+    writer = csv.writer(fp)
+    writer.writerow(REVISION_COLUMNS)
+    for revision in iter_revisions(wikiwho):
+        writer.writerow((revision.id, revision.editor, revision.timestamp, revision.length, revision.original_adds))
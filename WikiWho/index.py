@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Authorship queries over analysed articles: tokens of a revision, owner of a token at a position of a revision,
+tokens written by an editor and which of them survive in a revision.
+
+The index keeps token ids of each revision in arrays (in order and sorted), the origin revision of each token and
+postings of tokens by the editor who wrote them, so queries do not walk revisions and words of Wikiwho.
+
+Example usage:
+
+    from WikiWho.index import AuthorshipIndex
+
+    wikiwho.analyse_article(revisions)
+    index = AuthorshipIndex.from_wikiwho(wikiwho)
+    index.surviving_tokens(editor)  # token ids of editor in the last revision
+    index.owner(rev_id, 10)  # editor of the 11th token of the revision
+
+    # or while results are streamed, also if keep_revisions is False
+    index = AuthorshipIndex()
+    wikiwho.analyse_article(revisions, callback=index.add_result)
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from array import array
+from bisect import bisect_left
+
+from .utils import iter_rev_tokens
+
+# Type code of arrays of token and revision ids: 64 bits, as in export.
+try:
+    TYPECODE = str('q')
+    array(TYPECODE)
+except ValueError:
+    # python 2 has no 'q' type code, 'l' has at least 32 bits
+    TYPECODE = str('l')
+
+
+class AuthorshipIndex(object):
+    """
+    Index of revisions and tokens of an article. Revisions and tokens are added in the order of analysis.
+    Editors are known only for indexed revisions, tokens whose origin revision is not indexed have no editor.
+    """
+
+    def __init__(self):
+        self.ordered_revisions = []  # [rev_id, ..] of indexed revisions in order
+        self.editors = {}  # {rev_id: editor}
+        self.revision_tokens = {}  # {rev_id: array of token ids in order}
+        self.sorted_revision_tokens = {}  # {rev_id: array of token ids, ascending}
+        self.origin_rev_ids = array(TYPECODE)  # origin revision id of each token, by token id
+        self.postings = {}  # {editor: array of ids of tokens which are originally added by editor, ascending}
+
+    @classmethod
+    def from_wikiwho(cls, wikiwho):
+        """
+        Index a Wikiwho object after analysis. Only revisions in wikiwho.revisions are indexed, so if
+        keep_revisions is False, use add_result as callback of the analysis instead.
+        """
+        index = cls()
+        for rev_id in wikiwho.ordered_revisions:
+            revision = wikiwho.revisions.get(rev_id)
+            if revision is not None:
+                index.add_revision(rev_id, revision.editor, [word.token_id for word in iter_rev_tokens(revision)])
+        for word in wikiwho.tokens:
+            index.add_token(word.token_id, word.origin_rev_id)
+        return index
+
+    def add_result(self, result):
+        """Index a RevisionResult and the tokens which are created in it. Usable as callback of Wikiwho."""
+        self.add_revision(result.rev_id, result.editor, result.token_ids)
+        for token_id, origin_rev_id in zip(result.token_ids, result.origin_rev_ids):
+            # new tokens of a revision have ascending ids after the ids of all tokens before
+            if token_id == len(self.origin_rev_ids):
+                self.add_token(token_id, origin_rev_id)
+
+    def add_revision(self, rev_id, editor, token_ids):
+        self.ordered_revisions.append(rev_id)
+        self.editors[rev_id] = editor
+        self.revision_tokens[rev_id] = array(TYPECODE, token_ids)
+        self.sorted_revision_tokens[rev_id] = array(TYPECODE, sorted(token_ids))
+
+    def add_token(self, token_id, origin_rev_id):
+        """Tokens are added in order of token ids."""
+        if token_id != len(self.origin_rev_ids):
+            raise ValueError('Token {} is added after {} tokens.'.format(token_id, len(self.origin_rev_ids)))
+        self.origin_rev_ids.append(origin_rev_id)
+        editor = self.editors.get(origin_rev_id)
+        if editor is not None:
+            if editor in self.postings:
+                self.postings[editor].append(token_id)
+            else:
+                self.postings[editor] = array(TYPECODE, [token_id])
+
+    def revision(self, rev_id):
+        """:return: Array of token ids of the revision in order."""
+        return self.revision_tokens[rev_id]
+
+    def token_at(self, rev_id, position):
+        """:return: Id of the token at position of the revision."""
+        return self.revision_tokens[rev_id][position]
+
+    def origin(self, token_id):
+        """:return: Id of the revision where the token was originally added."""
+        return self.origin_rev_ids[token_id]
+
+    def editor(self, rev_id):
+        """:return: Editor of the revision or None if it is not indexed."""
+        return self.editors.get(rev_id)
+
+    def owner(self, rev_id, position):
+        """:return: Editor who originally added the token at position of the revision (None if not known)."""
+        return self.editors.get(self.origin_rev_ids[self.revision_tokens[rev_id][position]])
+
+    def tokens_of(self, editor):
+        """:return: Ascending array of ids of tokens which are originally added by editor."""
+        return self.postings.get(editor, array(TYPECODE))
+
+    def surviving_tokens(self, editor, rev_id=None):
+        """
+        :param rev_id: Revision id. Default is the last indexed revision.
+        :return: Ascending list of ids of tokens which are originally added by editor and are in the revision.
+        """
+        if rev_id is None:
+            rev_id = self.ordered_revisions[-1]
+        tokens = self.sorted_revision_tokens[rev_id]
+        postings = self.postings.get(editor, ())
+        if editor is None or len(postings) >= len(tokens):
+            editors = self.editors
+            origin_rev_ids = self.origin_rev_ids
+            return [token_id for token_id in tokens if editors.get(origin_rev_ids[token_id]) == editor]
+        # fewer tokens by editor than in the revision: each of them is searched in the sorted tokens of revision
+        surviving = []
+        end = len(tokens)
+        i = 0
+        for token_id in postings:
+            i = bisect_left(tokens, token_id, i, end)
+            if i == end:
+                break
+            if tokens[i] == token_id:
+                surviving.append(token_id)
+        return surviving
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Per revision statistics of Wikiwho analysis: time of paragraph, sentence and word stages and how structures are
+matched. Statistics are recorded only if Wikiwho gets an instrument (a function which is called with
+RevisionStats of each analysed revision), otherwise analysis has no extra work.
+
+Example usage:
+
+    from WikiWho.instrumentation import StatsCollector
+    from WikiWho.wikiwho import Wikiwho
+
+    collector = StatsCollector()
+    for title, revisions in articles:
+        wikiwho = Wikiwho(title, instrument=collector)
+        wikiwho.analyse_article(revisions)
+    print(collector.to_dict())
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import heapq
+
+# Vandalism decisions.
+VANDALISM_SPAM_HASH = 'spam_hash'  # content hash is of a revision detected as vandalism before
+VANDALISM_CHANGE_PERCENTAGE = 'change_percentage'  # large deletion, see wikiwho.CHANGE_PERCENTAGE
+VANDALISM_TOKEN_DENSITY = 'token_density'  # repeated tokens in new content, see wikiwho.TOKEN_DENSITY_LIMIT
+
+
+class RevisionStats(object):
+    """Statistics of the analysis of a revision."""
+    __slots__ = ('rev_id', 'seconds', 'paragraphs_seconds', 'sentences_seconds', 'words_seconds',
+                 'paragraphs', 'paragraphs_matched_prev', 'paragraphs_matched_ht',
+                 'sentences', 'sentences_matched_prev', 'sentences_matched_ht',
+                 'diff_tokens_prev', 'diff_tokens_curr', 'diff_guarded', 'diff_fallbacks', 'tokens_created',
+                 'token_density', 'vandalism', 'revert')
+
+    # Fields which are summed up by StatsCollector.
+    COUNTERS = ('seconds', 'paragraphs_seconds', 'sentences_seconds', 'words_seconds',
+                'paragraphs', 'paragraphs_matched_prev', 'paragraphs_matched_ht',
+                'sentences', 'sentences_matched_prev', 'sentences_matched_ht',
+                'diff_tokens_prev', 'diff_tokens_curr', 'diff_guarded', 'diff_fallbacks', 'tokens_created', 'revert')
+
+    def __init__(self, rev_id=0):
+        self.rev_id = rev_id
+        # Wall time in seconds of the whole analysis and of each stage. Stages which are not reached have 0.
+        self.seconds = 0.0
+        self.paragraphs_seconds = 0.0
+        self.sentences_seconds = 0.0
+        self.words_seconds = 0.0
+        # Non-empty paragraphs of the revision and how many of them are matched in the previous revision or
+        # in the hash table of paragraphs of older revisions.
+        self.paragraphs = 0
+        self.paragraphs_matched_prev = 0
+        self.paragraphs_matched_ht = 0
+        # Non-empty sentences (hashed) in unmatched paragraphs and how many of them are matched in unmatched
+        # paragraphs of the previous revision or in the hash table of sentences.
+        self.sentences = 0
+        self.sentences_matched_prev = 0
+        self.sentences_matched_ht = 0
+        # Input sizes of the diff: unmatched tokens of previous and current revision. 0 if there is no diff.
+        self.diff_tokens_prev = 0
+        self.diff_tokens_curr = 0
+        # True if the diff was over the budget of a guarded diff backend and was split (see diff.GuardedBackend),
+        # and the number of its pieces which fell back to prefix and suffix matching.
+        self.diff_guarded = False
+        self.diff_fallbacks = 0
+        self.tokens_created = 0
+        self.token_density = None  # average token frequency of new content if it is checked for spam
+        self.vandalism = None  # None if revision is accepted, otherwise one of vandalism decisions
+        self.revert = False  # True if the revision has the content of a known revision (see Wikiwho.known_contents)
+
+    def __repr__(self):
+        return str(id(self))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StatsCollector(object):
+    """
+    Instrument which aggregates RevisionStats, also across articles.
+    :param slowest: Number of slowest revisions to keep.
+    """
+    def __init__(self, slowest=10):
+        self.revisions = 0
+        # revert and diff_guarded: number of revisions
+        self.totals = dict.fromkeys(RevisionStats.COUNTERS, 0)
+        self.vandalism = {}  # {vandalism decision: number of revisions}
+        self.slowest = slowest
+        self.slowest_revisions = []  # heap of (seconds, rev_id)
+
+    def __call__(self, stats):
+        self.revisions += 1
+        totals = self.totals
+        for name in RevisionStats.COUNTERS:
+            totals[name] += getattr(stats, name)
+        if stats.vandalism is not None:
+            self.vandalism[stats.vandalism] = self.vandalism.get(stats.vandalism, 0) + 1
+        if self.slowest:
+            self._add_slowest(stats.seconds, stats.rev_id)
+
+    def _add_slowest(self, seconds, rev_id):
+        if len(self.slowest_revisions) < self.slowest:
+            heapq.heappush(self.slowest_revisions, (seconds, rev_id))
+        elif seconds > self.slowest_revisions[0][0]:
+            heapq.heapreplace(self.slowest_revisions, (seconds, rev_id))
+
+    def merge(self, other):
+        """Add statistics of another collector, e.g. of another worker process."""
+        self.revisions += other.revisions
+        for name in RevisionStats.COUNTERS:
+            self.totals[name] += other.totals[name]
+        for decision, count in other.vandalism.items():
+            self.vandalism[decision] = self.vandalism.get(decision, 0) + count
+        for seconds, rev_id in other.slowest_revisions:
+            self._add_slowest(seconds, rev_id)
+
+    def to_dict(self):
+        return {'revisions': self.revisions, 'totals': dict(self.totals), 'vandalism': dict(self.vandalism),
+                'slowest_revisions': [[rev_id, seconds] for seconds, rev_id in
+                                      sorted(self.slowest_revisions, reverse=True)]}
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Preprocessing of revisions in worker processes ahead of the analysis.
+
+Splitting, lowercasing, tokenizing and hashing depend only on the text of a revision, while matching is sequential.
+So worker processes prepare revisions several chunks ahead and Wikiwho consumes PreprocessedText of each revision.
+
+Example usage:
+
+    from multiprocessing import Pool
+    from WikiWho.wikiwho import Wikiwho
+
+    pool = Pool(3)
+    wikiwho = Wikiwho(title)
+    wikiwho.analyse_article(revisions, pool=pool)
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from collections import Counter, deque
+
+from .structures import PreprocessedText
+from .utils import get_hash_function, hash_paragraphs, hash_sentences
+
+# Revisions per task of a worker.
+CHUNK_SIZE = 8
+
+
+def preprocess_texts(texts, hash_function, text_prev=None):
+    """
+    Split and hash texts of consecutive revisions.
+    Sentences are prepared only for paragraphs which are not in the previous text, because others are mostly
+    matched as paragraphs. Texts of those paragraphs are not sent back either (None), Wikiwho splits remaining
+    unmatched paragraphs itself.
+    :param texts: Texts of consecutive revisions.
+    :param hash_function: Name of the hash function, see utils.HASH_FUNCTIONS.
+    :param text_prev: Text of the revision before texts.
+    :return: List of PreprocessedText.
+    """
+    calculate_hash = get_hash_function(hash_function)
+    if text_prev is None:
+        hashes_prev = Counter()
+    else:
+        hashes_prev = Counter(hash_value for _, hash_value in hash_paragraphs(text_prev.lower(), calculate_hash))
+    results = []
+    for text in texts:
+        paragraphs = []
+        hashes = Counter()
+        sentences = {}
+        for paragraph, hash_value in hash_paragraphs(text.lower(), calculate_hash):
+            hashes[hash_value] += 1
+            if hashes[hash_value] > hashes_prev[hash_value]:
+                if hash_value not in sentences:
+                    sentences[hash_value] = hash_sentences(paragraph, calculate_hash)
+                paragraphs.append((paragraph, hash_value))
+            else:
+                paragraphs.append((None, hash_value))
+        results.append(PreprocessedText(paragraphs, sentences))
+        hashes_prev = hashes
+    return results
+
+
+def iter_preprocessed(revisions, pool, hash_function, lookahead=None, chunk_size=CHUNK_SIZE):
+    """
+    Preprocess revisions in the pool while they are consumed.
+    :param revisions: Iterator of arguments of Wikiwho.analyse_revision, e.g. iter_json_revisions(page).
+    :param pool: multiprocessing Pool.
+    :param hash_function: Name of the hash function of Wikiwho.
+    :param lookahead: Maximum number of chunks in preparation. Default is 2 chunks per process of the pool.
+    :return: Generator of arguments of Wikiwho.analyse_revision with the PreprocessedText of the revision.
+    """
+    if lookahead is None:
+        lookahead = 2 * getattr(pool, '_processes', 1)
+    pending = deque()  # [(chunk of revisions, async result), ..]
+    chunk = []
+    text_prev = None
+    for revision in revisions:
+        chunk.append(revision)
+        if len(chunk) == chunk_size:
+            texts = [revision[1] for revision in chunk]
+            pending.append((chunk, pool.apply_async(preprocess_texts, (texts, hash_function, text_prev))))
+            text_prev = texts[-1]
+            chunk = []
+            while len(pending) > lookahead:
+                chunk_ready, result = pending.popleft()
+                for revision_ready, preprocessed in zip(chunk_ready, result.get()):
+                    yield revision_ready + (preprocessed, )
+    while pending:
+        chunk_ready, result = pending.popleft()
+        for revision_ready, preprocessed in zip(chunk_ready, result.get()):
+            yield revision_ready + (preprocessed, )
+    if chunk:
+        # last revisions are prepared here, they are analysed right after
+        texts = [revision[1] for revision in chunk]
+        for revision, preprocessed in zip(chunk, preprocess_texts(texts, hash_function, text_prev)):
+            yield revision + (preprocessed, )
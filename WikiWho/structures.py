@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 """
+Structures of the analysis: words (tokens), sentences, paragraphs and revisions.
+
+Word.outbound and Word.inbound are empty tuples until the first revision id is added, then lists. They are read
+as sequences (iteration, len, indexing, truthiness), but are written only with Word.add_outbound and
+Word.add_inbound: appending to them directly fails for words without revision ids, and comparing them with []
+is False for those words, use `not word.outbound` instead.
 
 :Authors:
     Maribel Acosta,
@@ -10,31 +16,83 @@
 
 
 class Word(object):
-    """Implementation of the structure "Word (Token)", which includes the authorship information."""
+    """
+    Implementation of the structure "Word (Token)", which includes the authorship information.
+    Revision ids are added to outbound and inbound only with add_outbound and add_inbound (see module docstring).
+    """
+    # Articles can have millions of words, so no __dict__ per word.
+    __slots__ = ('token_id', 'value', 'origin_rev_id', 'outbound', 'inbound', 'last_rev_id', 'matched')
+
     def __init__(self):
         self.token_id = 0  # Sequential id (position) in article. Unique per article.
         self.value = ''  # The word (simple text).
         self.origin_rev_id = 0  # Revision id where the word was included.
-        self.outbound = []
-        self.inbound = []
+        # Revision ids where the word was deleted/reinserted. Most words have none, so a list is created on first add.
+        self.outbound = ()
+        self.inbound = ()
         self.last_rev_id = 0  # Revision id where the word was last time used.
-        self.matched = False
+        self.matched = 0  # Epoch of the analysis in which the word was matched last time.
 
     def __repr__(self):
         return str(id(self))
 
+    def add_outbound(self, rev_id):
+        if self.outbound:
+            self.outbound.append(rev_id)
+        else:
+            self.outbound = [rev_id]
+
+    def add_inbound(self, rev_id):
+        if self.inbound:
+            self.inbound.append(rev_id)
+        else:
+            self.inbound = [rev_id]
+
     def to_dict(self):
         word = {self.origin_rev_id: self.value}
         return word
 
 
+class Vocabulary(object):
+    """
+    Distinct token values of an article with sequential integer ids.
+    Words of the same token share the value stored here instead of keeping their own copy of the text.
+    """
+    __slots__ = ('ids', 'values')
+
+    def __init__(self, values=()):
+        self.ids = {}  # {value: id}
+        self.values = []  # [value, ..] ordered by id.
+        for value in values:
+            self.add(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    def add(self, value):
+        """:return: Id of the value. It is added if it is new."""
+        try:
+            return self.ids[value]
+        except KeyError:
+            id_ = self.ids[value] = len(self.values)
+            self.values.append(value)
+            return id_
+
+    def intern(self, value):
+        """:return: The stored value which is equal to value."""
+        return self.values[self.add(value)]
+
+
 class Sentence(object):
     def __init__(self):
         self.hash_value = ''  # The hash value of the sentence.
         self.value = ''  # The sentence (simple text).
         self.splitted = []  # List of strings composing the sentence.
         self.words = []  # List of words in the sentence. It is an array of Word.
-        self.matched = False  # Flag.
+        self.matched = 0  # Epoch of the analysis in which it was matched last time.
 
     def __repr__(self):
         return str(id(self))
@@ -57,7 +115,7 @@ class Paragraph(object):
         self.value = ''  # The text of the paragraph.
         self.sentences = {}  # Dictionary of sentences in the paragraph. {sentence_hash : [sentence_obj, ..]}
         self.ordered_sentences = []  # List with the hash of the sentences, ordered by hash appeareances.
-        self.matched = False  # Flag.
+        self.matched = 0  # Epoch of the analysis in which it was matched last time.
 
     def __repr__(self):
         return str(id(self))
@@ -109,3 +167,43 @@ class Revision(object):
             revision['obj'].append(p)
 
         return revision
+
+
+class PreprocessedText(object):
+    """Split and hashed text of a revision, prepared ahead of the analysis (see pipeline)."""
+    __slots__ = ('paragraphs', 'sentences')
+
+    def __init__(self, paragraphs=None, sentences=None):
+        # [(paragraph, hash_value), ..], see utils.hash_paragraphs. Text of a paragraph can be None, if it is
+        # probably matched.
+        self.paragraphs = paragraphs or []
+        # Sentences of paragraphs which are probably not matched. {paragraph_hash: [(sentence, hash_value), ..]}
+        self.sentences = sentences or {}
+
+    def __getstate__(self):
+        return self.paragraphs, self.sentences
+
+    def __setstate__(self, state):
+        self.paragraphs, self.sentences = state
+
+
+class RevisionResult(object):
+    """Authorship of a revision, created right after the revision is analysed when results are streamed."""
+    __slots__ = ('rev_id', 'editor', 'timestamp', 'token_ids', 'origin_rev_ids', 'added', 'removed')
+
+    def __init__(self):
+        self.rev_id = 0  # Wikipedia revision id.
+        self.editor = ''  # id if id != 0 else '0|{}'.format(name)
+        self.timestamp = 0
+        self.token_ids = []  # Ordered token ids of the revision.
+        self.origin_rev_ids = []  # Origin revision ids of tokens in token_ids.
+        self.added = []  # Token ids which are newly added or reinserted in this revision.
+        self.removed = []  # Token ids of the previous revision which are deleted in this revision.
+
+    def __repr__(self):
+        return str(id(self))
+
+    def to_dict(self):
+        return {'rev_id': self.rev_id, 'editor': self.editor, 'timestamp': self.timestamp,
+                'token_ids': self.token_ids, 'origin_rev_ids': self.origin_rev_ids,
+                'added': self.added, 'removed': self.removed}
@@ -9,8 +9,9 @@
 from __future__ import division
 from __future__ import unicode_literals
 import hashlib
-from collections import Counter
+from collections import Counter, OrderedDict
 import re
+import struct
 
 
 regex_dot = re.compile(r"([^\s\.=][^\s\.=][^\s\.=]\.) ")
@@ -22,84 +23,270 @@ def calculate_hash(text):
     return hashlib.md5(text.encode('utf-8')).hexdigest()
 
 
+def calculate_blake2b_hash(text):
+    """12 bytes digest. Needs python >= 3.6."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).digest()
+
+
+def calculate_blake2b_int_hash(text):
+    """64 bit integer digest. Smallest keys, but collisions are possible in articles with billions of sentences."""
+    return struct.unpack(str('<q'), hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest())[0]
+
+
+# Hash functions for keys of hash tables of paragraphs and sentences. {name: (function, key type)}
+HASH_FUNCTIONS = {
+    'md5': (calculate_hash, 'str'),
+    'blake2b': (calculate_blake2b_hash, 'bytes'),
+    'blake2b-int': (calculate_blake2b_int_hash, 'int'),
+}
+
+
+def get_hash_function(name=None):
+    """
+    :param name: 'md5' (default, 32 chars hex), 'blake2b' (12 bytes) or 'blake2b-int' (64 bit integer).
+    :return: Hash function.
+    """
+    name = name or 'md5'
+    if name not in HASH_FUNCTIONS:
+        raise ValueError('Unknown hash function: {}. Options are: {}'.format(name, ', '.join(sorted(HASH_FUNCTIONS))))
+    if name.startswith('blake2b') and not hasattr(hashlib, 'blake2b'):
+        raise ValueError('{} hash function needs python >= 3.6'.format(name))
+    return HASH_FUNCTIONS[name][0]
+
+
+regex_new_lines = re.compile(r'\n\n+')
+regex_table_syntax = re.compile(r'<table>|<tr>|</table>|</tr>|\{\||\|\}|\|-')
+# Table syntax which is put into separate paragraphs: (token, offset of paragraph break from token start).
+TABLE_SYNTAX = [('<table>', 0), ('</table>', 8), ('<tr>', 0), ('</tr>', 5), ('{|', 0), ('|}', 2), ('|-', 0)]
+# Sentence breaks: (token, offset of start of '@@@@' marker from token start, number of replaced chars).
+# '. ' is a break only if regex_dot matches (see _is_dot_break).
+SENTENCE_BREAKS = [('\n', 1, 0), ('. ', 1, 1), ('; ', 1, 1), ('? ', 1, 1), ('! ', 1, 1), (': ', 1, 1), ('\t', 1, 0),
+                   ('<!--', 0, 0), ('-->', 3, 0), ('<ref', 0, 0), ('/ref>', 5, 0)]
+regex_dot_char = re.compile(r'[^\s\.=]')
+regex_url_end = re.compile(r'[ \|<>\n\r]')
+
+
+def paragraph_offsets(text):
+    """
+    Split text into paragraphs without creating intermediate copies of text.
+    :param text: Text with only '\n' new lines (see split_into_paragraphs).
+    :return: List of (start, end) offsets of paragraphs in text.
+    """
+    if not regex_table_syntax.search(text):
+        # same as text.split('\n\n')
+        offsets = []
+        start = 0
+        i = text.find('\n\n')
+        while i != -1:
+            offsets.append((start, i))
+            start = i + 2
+            i = text.find('\n\n', start)
+        offsets.append((start, len(text)))
+        return offsets
+
+    # Old splitter inserted '\n\n' before/after table syntax and then split at '\n\n'. Here new line runs of text
+    # and inserted '\n\n's are (start, end, number of new lines) events.
+    events = [(m.start(), m.end(), m.end() - m.start()) for m in regex_new_lines.finditer(text)]
+    single_new_lines = set()
+    for token, offset in TABLE_SYNTAX:
+        i = text.find(token)
+        while i != -1:
+            # '|-' is a break only before new line, or where '\n\n' is inserted before other syntax
+            if token != '|-' or text.startswith(('\n', '<table>', '<tr>', '{|'), i + 2):
+                p = i + offset
+                events.append((p, p, 2))
+                # single new lines around are merged with inserted ones too
+                if p and text[p - 1] == '\n' and (p == 1 or text[p - 2] != '\n'):
+                    single_new_lines.add(p - 1)
+                if text.startswith('\n', p) and not text.startswith('\n', p + 1):
+                    single_new_lines.add(p)
+            i = text.find(token, i + 1)
+    events.extend((p, p + 1, 1) for p in single_new_lines)
+    events.sort()
+
+    # Each run of new lines gives run_length // 2 breaks and with odd length the next paragraph starts with a new
+    # line, which is always the last new line of the run in text.
+    offsets = []
+    paragraph_start = 0
+    run_start = run_end = -1
+    run_length = 0
+    for i, j, length in events:
+        if i == run_end:
+            run_end = j
+            run_length += length
+            continue
+        if run_length >= 2:
+            offsets.append((paragraph_start, run_start))
+            offsets.extend([(run_end, run_end)] * (run_length // 2 - 1))
+            paragraph_start = run_end - run_length % 2
+        run_start, run_end, run_length = i, j, length
+    if run_length >= 2:
+        offsets.append((paragraph_start, run_start))
+        offsets.extend([(run_end, run_end)] * (run_length // 2 - 1))
+        paragraph_start = run_end - run_length % 2
+    offsets.append((paragraph_start, len(text)))
+    return offsets
+
+
 def split_into_paragraphs(text):
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    # html table syntax
-    text = text.replace('<table>', '\n\n<table>').replace('</table>', '</table>\n\n')
-    text = text.replace('<tr>', '\n\n<tr>').replace('</tr>', '</tr>\n\n')
-    # wp table syntax
-    text = text.replace('{|', '\n\n{|').replace('|}', '|}\n\n')
-    text = text.replace('|-\n', '\n\n|-\n')
-    return text.split('\n\n')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if not regex_table_syntax.search(text):
+        return text.split('\n\n')
+    return [text[start:end] for start, end in paragraph_offsets(text)]
+
+
+def _is_dot_break(text, i, start):
+    """
+    True if regex_dot matches '.' at i in old splitter, where '@@@@' was already inserted after new lines:
+    3 chars before '.' are not space, '.' or '=', or a new line comes before.
+    """
+    for j in range(i - 1, i - 4, -1):
+        if j < start:
+            return False
+        c = text[j]
+        if c == '\n':
+            return True
+        if not regex_dot_char.match(c):
+            return False
+    return True
+
+
+def _is_removed_space(text, i, start):
+    """True if space at i was replaced by '@@@@' in old splitter."""
+    c = text[i - 1]
+    return c in ';?!:' or c == '.' and _is_dot_break(text, i - 1, start)
+
+
+def sentence_offsets(text, start=0, end=None):
+    """
+    Split text[start:end] into sentences without creating intermediate copies of text.
+    :return: List of (start, end) offsets of sentences in text.
+    """
+    # Old splitter inserted '@@@@' markers at sentence breaks, some of them replacing a space, collapsed '@' runs
+    # and split at '@@@@'. Here markers are (start, end, number of @) events in text. Runs of '@'s in text are
+    # events too, because they are merged with markers.
+    end = len(text) if end is None else end
+    events = []
+    for token, offset, replaced in SENTENCE_BREAKS:
+        i = text.find(token, start, end)
+        while i != -1:
+            if token != '. ' or _is_dot_break(text, i, start):
+                events.append((i + offset, i + offset + replaced, 4))
+            i = text.find(token, i + 1, end)
+    i = text.find('@', start, end)
+    while i != -1:
+        j = i + 1
+        while j < end and text[j] == '@':
+            j += 1
+        events.append((i, j, j - i))
+        i = text.find('@', j, end)
+    # regex_url: http.*?://.*?[ \|<>\n\r]
+    i = text.find('http', start, end)
+    while i != -1:
+        line_end = text.find('\n', i, end)
+        separator = text.find('://', i + 4, end if line_end == -1 else line_end)
+        url_end = None
+        if separator != -1:
+            pos = separator + 3
+            while url_end is None:
+                m = regex_url_end.search(text, pos, end)
+                if m is None:
+                    break
+                pos = m.end()
+                # spaces replaced by markers are not in text anymore
+                if m.group() != ' ' or not _is_removed_space(text, m.start(), start):
+                    url_end = pos
+            if url_end is None:
+                # no url can end anymore
+                break
+            events.append((i, i, 4))
+            events.append((url_end, url_end, 4))
+        i = text.find('http', i + 1 if url_end is None else url_end, end)
+    events.sort()
+
+    # An '@' run of length >= 4 is collapsed to 4-7 '@'s and gives one break. The rest (length % 4) are text
+    # '@'s at the end of the run and start the next sentence.
+    offsets = []
+    sentence_start = start
+    run_start = run_end = -1
+    run_length = 0
+    for i, j, length in events:
+        if i == run_end:
+            run_end = j
+            run_length += length
+            continue
+        if run_length >= 4:
+            offsets.append((sentence_start, run_start))
+            sentence_start = run_end - run_length % 4
+        run_start, run_end, run_length = i, j, length
+    if run_length >= 4:
+        offsets.append((sentence_start, run_start))
+        sentence_start = run_end - run_length % 4
+    offsets.append((sentence_start, end))
+    return offsets
 
 
 def split_into_sentences(text):
-    text = text.replace('\n', '\n@@@@')
-    # punctuation = ('. ', '\n', '; ', '? ', '! ', ': ', )
-    # text = text.replace('. ', '.@@@@')
-    text = regex_dot.sub(r'\1@@@@', text)
-    text = text.replace('; ', ';@@@@')
-    text = text.replace('? ', '?@@@@')
-    text = text.replace('! ', '!@@@@')
-    text = text.replace(': ', ':@@@@')
-    text = text.replace('\t', '\t@@@@')
-    # comments as sentence
-    text = text.replace('<!--', '@@@@<!--')
-    text = text.replace('-->', '-->@@@@')
-    # references as sentence. ex: <ref name="...">{{ ... }}</ref>
-    # text = text.replace('>{', '>@@@@{')
-    # text = text.replace('}<', '}@@@@<')
-    text = text.replace('<ref', '@@@@<ref')
-    text = text.replace('/ref>', '/ref>@@@@')
-    # urls as sentence
-    text = regex_url.sub(r'@@@@\1@@@@', text)
-
-    # text = text.replace('.{', '.||{')
-    # text = text.replace('!{', '!||{')
-    # text = text.replace('?{', '?||{')
-    # text = text.replace('.[', '.||[')
-    # text = text.replace('.]]', '.]]||')
-    # text = text.replace('![', '!||[')
-    # text = text.replace('?[', '?||[')
-
-    while '@@@@@@@@' in text:
-        text = text.replace('@@@@@@@@', '@@@@')
-    return text.split('@@@@')
+    return [text[start:end] for start, end in sentence_offsets(text)]
+
+
+# Each symbol is a token.
+SYMBOLS = ['.', ',', ';', ':', '?', '!', '-', '_', '/', '\\', '(', ')', '[', ']', '{', '}', '*', '#', '@',
+           '&', '=', '+', '%', '~', '$', '^', '<', '>', '"', '\'', '´', '`', '¸', '˛', '’',
+           '¤', '₳', '฿', '₵', '¢', '₡', '₢', '₫', '₯', '֏', '₠', '€', 'ƒ', '₣', '₲', '₴', '₭', '₺',
+           '₾', 'ℳ', '₥', '₦', '₧', '₱', '₰', '£', '៛', '₽', '₹', '₨', '₪', '৳', '₸', '₮', '₩', '¥',
+           '§', '‖', '¦', '⟨', '⟩', '–', '—', '¯', '»', '«', '”', '÷', '×', '′', '″', '‴', '¡',
+           '¿', '©', '℗', '®', '℠', '™']
+# currency_symbols_long = '¢,£,¤,¥,֏,؋,৲,৳,৻,૱,௹,฿,៛,₠,₡,₢,₣,₤,₥,₦,₧,₨,₩,₪,₫,€,₭,₮,₯,₰,₱,₲,₳,₴,₵' \
+#                    ',₶,₷,₸,₹,₺,꠸,﷼,﹩,＄,￠,￡,￥,￦'.split(',')
+# Special character groups which are tokens. They are matched left to right, so '[[[' is '[[' and '['.
+# '<!---->' is '<!--' and '-->'.
+SYMBOL_GROUPS = ['[[', ']]', '{{', '}}', '<!--', '-->']
+_SYMBOL_CLASS = ''.join(re.escape(c) for c in SYMBOLS + ['|'])
+# A token is a symbol group, a symbol, | or a run of characters which are none of them, space or new line.
+regex_token = re.compile('|'.join([re.escape(group) for group in SYMBOL_GROUPS] +
+                                  ['[{}]'.format(_SYMBOL_CLASS), '[^{} \n]+'.format(_SYMBOL_CLASS)]))
+# In old tokenizer | was replaced by this placeholder and then back, so the word is a | token too.
+_PIPE_PLACEHOLDER = 'ææææ'
 
 
 def split_into_tokens(text):
-    text = text.replace('|', '||ææææ||')  # use | as delimiter
-
-    text = text.replace('\n', '||').replace(' ', '||')
-
-    symbols = ['.', ',', ';', ':', '?', '!', '-', '_', '/', '\\', '(', ')', '[', ']', '{', '}', '*', '#', '@',
-               '&', '=', '+', '%', '~', '$', '^', '<', '>', '"', '\'', '´', '`', '¸', '˛', '’',
-               '¤', '₳', '฿', '₵', '¢', '₡', '₢', '₫', '₯', '֏', '₠', '€', 'ƒ', '₣', '₲', '₴', '₭', '₺',
-               '₾', 'ℳ', '₥', '₦', '₧', '₱', '₰', '£', '៛', '₽', '₹', '₨', '₪', '৳', '₸', '₮', '₩', '¥',
-               '§', '‖', '¦', '⟨', '⟩', '–', '—', '¯', '»', '«', '”', '÷', '×', '′', '″', '‴', '¡',
-               '¿', '©', '℗', '®', '℠', '™']
-    # currency_symbols_long = '¢,£,¤,¥,֏,؋,৲,৳,৻,૱,௹,฿,៛,₠,₡,₢,₣,₤,₥,₦,₧,₨,₩,₪,₫,€,₭,₮,₯,₰,₱,₲,₳,₴,₵' \
-    #                    ',₶,₷,₸,₹,₺,꠸,﷼,﹩,＄,￠,￡,￥,￦'.split(',')
-    for c in symbols:
-        text = text.replace(c, '||{}||'.format(c))
-
-    # re-construct some special character groups as they are tokens
-    text = text.replace('[||||[', '[[').replace(']||||]', ']]')
-    text = text.replace('{||||{', '{{').replace('}||||}', '}}')
-    # text = text.replace('||.||||.||||.||', '...')
-    # text = text.replace('/||||>', '/>').replace('<||||/', '</')
-    # text = text.replace('-||||-', '--')
-    # text = text.replace('<||||!||||--||', '||<!--||').replace('||--||||>', '||-->||')
-    text = text.replace('<||||!||||-||||-||', '||<!--||').replace('||-||||-||||>', '||-->||')
-
-    while '||||' in text:
-        text = text.replace('||||', '||')
-
-    tokens = filter(lambda a: a != '', text.split('||'))  # filter empty strings
-    tokens = ['|' if w == 'ææææ' else w for w in tokens]  # insert back the |s
+    tokens = regex_token.findall(text)
+    if _PIPE_PLACEHOLDER in text:
+        tokens = ['|' if w == _PIPE_PLACEHOLDER else w for w in tokens]
     return tokens
 
 
+def hash_paragraphs(text, calculate_hash):
+    """
+    :param text: Lowercased text of a revision.
+    :return: [(paragraph, hash_value), ..] of non-empty paragraphs in order.
+    """
+    paragraphs = []
+    for paragraph in split_into_paragraphs(text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            # TODO should we clean whitespaces in paragraph level?
+            # paragraph = ' '.join(split_into_tokens(paragraph))
+            paragraphs.append((paragraph, calculate_hash(paragraph)))
+    return paragraphs
+
+
+def hash_sentences(paragraph, calculate_hash):
+    """
+    :param paragraph: Text of a paragraph.
+    :return: [(sentence, hash_value), ..] of non-empty sentences in order. Tokens of a sentence are joined by ' '.
+    """
+    sentences = []
+    for sentence in split_into_sentences(paragraph):
+        sentence = sentence.strip()
+        if sentence:
+            sentence = ' '.join(split_into_tokens(sentence))  # here whitespaces in the sentence are cleaned
+            sentences.append((sentence, calculate_hash(sentence)))  # then hash values is calculated
+    return sentences
+
+
 def compute_avg_word_freq(token_list):
     c = Counter(token_list)  # compute count of each token in the list
     # remove some tokens
@@ -111,31 +298,91 @@ def compute_avg_word_freq(token_list):
     return sum(c.values()) / len(c) if c else 0
 
 
+def iter_ordered(ordered_hashes, items):
+    """
+    Yield paragraphs or sentences in order.
+    nth appearance of a hash in ordered_hashes is the nth object in the list of that hash.
+    :param ordered_hashes: Ordered list of hashes. Ex: revision.ordered_paragraphs
+    :param items: Dictionary of objects. {hash : [obj, ..]}. Ex: revision.paragraphs
+    """
+    seen = {}  # {hash: number of appearances so far}
+    for hash_value in ordered_hashes:
+        objs = items[hash_value]
+        if len(objs) > 1:
+            ordinal = seen.get(hash_value, 0)
+            seen[hash_value] = ordinal + 1
+            yield objs[ordinal]
+        else:
+            yield objs[0]
+
+
+def skip_matched(candidates, start, epoch):
+    """
+    Skip candidates which are matched in the current analysis.
+    :param candidates: List of paragraphs or sentences with the same hash.
+    :param start: Index to start from.
+    :param epoch: Epoch of the current analysis.
+    :return: Index of the first candidate from start on which is not matched, or len(candidates).
+    """
+    while start < len(candidates) and candidates[start].matched == epoch:
+        start += 1
+    return start
+
+
 def iter_rev_tokens(revision):
     """Yield tokens of the revision in order."""
-    # from copy import deepcopy
-    # ps_copy = deepcopy(revision.paragraphs)
-    tmp = {'p': [], 's': []}
-    for hash_paragraph in revision.ordered_paragraphs:
-        # paragraph = ps_copy[hash_paragraph].pop(0)
-        if len(revision.paragraphs[hash_paragraph]) > 1:
-            tmp['p'].append(hash_paragraph)
-            paragraph = revision.paragraphs[hash_paragraph][tmp['p'].count(hash_paragraph)-1]
-        else:
-            paragraph = revision.paragraphs[hash_paragraph][0]
-        tmp['s'][:] = []
-        for hash_sentence in paragraph.ordered_sentences:
-            if len(paragraph.sentences[hash_sentence]) > 1:
-                # tmp['s'].append('{}-{}'.format(hash_paragraph, hash_sentence))  # and dont do tmp['s'][:] = []
-                tmp['s'].append(hash_sentence)
-                sentence = paragraph.sentences[hash_sentence][tmp['s'].count(hash_sentence)-1]
-            else:
-                sentence = paragraph.sentences[hash_sentence][0]
-            # sentence = paragraph.sentences[hash_sentence].pop(0)
+    for paragraph in iter_ordered(revision.ordered_paragraphs, revision.paragraphs):
+        for sentence in iter_ordered(paragraph.ordered_sentences, paragraph.sentences):
             for word in sentence.words:
                 yield word
 
 
+class OrderedSet(object):
+    """
+    Set which keeps items in insertion order. Adding an existing item moves it to the end.
+    If maxlen is given, the oldest items are dropped when the set grows beyond it.
+    It replaces lists (e.g. Wikiwho.spam_ids) and can be read like a list: iteration, len, indexing and slicing
+    (both walk the items) and append as an alias of add. It is not a list: comparing it with a list is False and
+    json cannot serialise it, use to_list().
+    """
+    def __init__(self, items=(), maxlen=None):
+        self.maxlen = maxlen
+        self._items = OrderedDict()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        items = self._items
+        if item in items:
+            del items[item]
+        items[item] = None
+        if self.maxlen is not None and len(items) > self.maxlen:
+            items.popitem(last=False)
+
+    # list compatibility
+    append = add
+
+    def to_list(self):
+        return list(self._items)
+
+    def __getitem__(self, index):
+        if index == -1 and self._items:
+            return next(reversed(self._items))
+        return list(self._items)[index]
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return 'OrderedSet({!r})'.format(list(self._items))
+
+
 # def iter_wikiwho_tokens(wikiwho):
 #     """Yield tokens of the article in order."""
 #     article_token_ids = set()
@@ -12,11 +12,16 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from difflib import Differ
+from collections import OrderedDict
+from timeit import default_timer
 
-from .structures import Word, Sentence, Paragraph, Revision
-from .utils import calculate_hash, split_into_paragraphs, split_into_sentences, split_into_tokens, \
-    compute_avg_word_freq
+from .diff import get_backend, resolve
+from .instrumentation import RevisionStats, VANDALISM_SPAM_HASH, VANDALISM_CHANGE_PERCENTAGE, \
+    VANDALISM_TOKEN_DENSITY
+from .pipeline import iter_preprocessed
+from .structures import Word, Sentence, Paragraph, Revision, RevisionResult, PreprocessedText, Vocabulary
+from .utils import calculate_hash, hash_paragraphs, hash_sentences, compute_avg_word_freq, iter_ordered, \
+    iter_rev_tokens, get_hash_function, skip_matched, OrderedSet
 
 
 # Spam detection variables.
@@ -27,17 +32,77 @@ FLAG = "move"
 UNMATCHED_PARAGRAPH = 0.0
 TOKEN_DENSITY_LIMIT = 20
 TOKEN_LEN = 100
+# Number of latest accepted revisions whose content can be reused by reverts, if only the last revision is kept.
+KNOWN_CONTENTS_LIMIT = 1000
+
+
+def iter_xml_revisions(page):
+    """
+    Yield arguments of Wikiwho.analyse_revision for revisions from XML Dump Iterator.
+    Revisions with hidden or missing text are skipped.
+    """
+    for revision in page:
+        text = revision.text or ''
+        if not text and (revision.deleted.text or revision.deleted.restricted):
+            # equivalent of "'texthidden' in revision or 'textmissing' in revision" in iter_json_revisions
+            continue
+
+        # Get editor information
+        if revision.user:
+            user_text = revision.user.text
+            contributor_name = '' if not user_text or user_text == 'None' else user_text
+            if revision.user.id is None and contributor_name or revision.user.id == 0:
+                contributor_id = 0
+            else:
+                contributor_id = revision.user.id or ''
+        else:
+            # Some revisions don't have contributor.
+            contributor_name = ''
+            contributor_id = ''
+        editor = contributor_id
+        editor = str(editor) if editor != 0 else '0|{}'.format(contributor_name)
+
+        yield (revision.id, text, revision.sha1 or calculate_hash(text), revision.timestamp.long_format(), editor,
+               bool(revision.comment and revision.minor))
+
+
+def iter_json_revisions(page):
+    """
+    Yield arguments of Wikiwho.analyse_revision for revisions in json form (Wikipedia api).
+    Revisions with hidden or missing text are skipped.
+    """
+    for revision in page:
+        if 'texthidden' in revision or 'textmissing' in revision:
+            continue
+
+        text = revision.get('*', '')
+        # Get editor information.
+        # Some revisions don't have editor.
+        contributor_id = revision.get('userid', '')
+        contributor_name = revision.get('user', '')
+        editor = contributor_id
+        editor = str(editor) if editor != 0 else '0|{}'.format(contributor_name)
+
+        yield (int(revision['revid']), text, revision.get('sha1', calculate_hash(text)), revision['timestamp'], editor,
+               bool(revision.get('comment') and 'minor' in revision))
 
 
 class Wikiwho:
-    def __init__(self, article_title):
+    def __init__(self, article_title, diff_backend=None, keep_revisions=True, hash_function=None, instrument=None,
+                 spam_limit=None):
         # Hash tables.
         self.paragraphs_ht = {}
         self.sentences_ht = {}
 
-        self.spam_ids = []
-        self.spam_hashes = []
+        # Ids and content hashes of revisions detected as vandalism, in order of detection. Revisions with a content
+        # hash in spam_hashes are vandalism too. If spam_limit is given, only the latest spam_limit of each are kept,
+        # e.g. for analysers of long living articles. They are utils.OrderedSet, not lists (see its docstring).
+        self.spam_limit = spam_limit
+        self.spam_ids = OrderedSet(maxlen=spam_limit)
+        self.spam_hashes = OrderedSet(maxlen=spam_limit)
         self.tokens = []  # [word_obj, ..] ordered, unique list of tokens of this article
+        # Distinct token values of this article, values of words are taken from here.
+        self.vocabulary = Vocabulary()
         self.revisions = {}  # {rev_id : rev_obj, ...}
         self.ordered_revisions = []  # [rev_id, ...]
         self.rvcontinue = '0'
@@ -49,7 +114,34 @@ class Wikiwho:
         self.revision_prev = Revision()
 
         self.text_curr = ''
-        self.temp = []
+        # {hash: text} of paragraphs of text_curr, built by paragraph_value on first use in a revision.
+        self.paragraph_values = None
+        # PreprocessedText of the current revision if it is prepared by pipeline, otherwise None.
+        self.preprocessed = None
+        # Incremented for each analysed revision. Structures with matched == epoch are matched in current analysis.
+        self.epoch = 0
+        # Sentences of matched structures of the previous revision whose words are not set as matched yet, while
+        # lazy_marking is True (see mark_words). Both are reset after each analysis.
+        self.unmarked_sentences = []
+        self.lazy_marking = True
+        # Diff of tokens in unmatched sentences. 'differ' (default), 'myers', 'check', 'guarded' or a backend object.
+        self.diff_backend = get_backend(diff_backend)
+        # If False, only the last accepted revision is kept in self.revisions, because analysis of the next revision
+        # needs only hash tables, tokens and revision_prev. ordered_revisions still contains all revision ids.
+        # Use callback or iter_analyse_* to store authorship of each revision while the analysis goes on.
+        self.keep_revisions = keep_revisions
+        # {rev_hash: ordered_paragraphs} of accepted revisions. If a revision has the content of a known revision
+        # (revert or null edit), its paragraph hashes are taken from there instead of splitting and hashing the text.
+        # Limited to the latest KNOWN_CONTENTS_LIMIT revisions if keep_revisions is False.
+        self.known_contents = {} if keep_revisions else OrderedDict()
+        # Hash function of paragraphs and sentences, keys of hash tables. 'md5' (default), 'blake2b' or
+        # 'blake2b-int'. Binary and integer keys use less memory.
+        self.hash_function = hash_function or 'md5'
+        self.calculate_hash = get_hash_function(self.hash_function)
+        # Optional function which is called with RevisionStats of each analysed revision (see instrumentation).
+        # If None, no statistics are recorded.
+        self.instrument = instrument
+        self.stats = None  # RevisionStats of the revision in analysis
 
     def clean_attributes(self):
         """
@@ -57,152 +149,200 @@ class Wikiwho:
         """
         self.revision_prev = None
         self.text_curr = ''
-        self.temp = []
+        self.paragraph_values = None
+        self.preprocessed = None
+        self.unmarked_sentences = []
+        self.lazy_marking = True
 
-    def analyse_article_from_xml_dump(self, page):
+    def analyse_article_from_xml_dump(self, page, callback=None, pool=None):
         """
         Analyse page from XML Dump Iterator.
         :param page: Page meta data and a Revision iterator. Each revision contains metadata and text.
+        :param callback: Optional function which is called with a RevisionResult after each accepted revision.
+        :param pool: Optional multiprocessing Pool. If given, revisions are split and hashed in its processes ahead
+        of the analysis (see pipeline).
         """
-        # Iterate over revisions of the article.
-        for revision in page:
-            text = revision.text or ''
-            if not text and (revision.deleted.text or revision.deleted.restricted):
-                # equivalent of "'texthidden' in revision or 'textmissing' in revision" in analyse_article
-                continue
-
-            vandalism = False
-            # Update the information about the previous revision.
-            self.revision_prev = self.revision_curr
-
-            rev_id = revision.id
-            rev_hash = revision.sha1 or calculate_hash(text)
-            if rev_hash in self.spam_hashes:
-                vandalism = True
-
-            # TODO: spam detection: DELETION
-            text_len = len(text)
-            if not vandalism and not(revision.comment and revision.minor):
-                # if content is not moved (flag) to different article in good faith, check for vandalism
-                # if revisions have reached a certain size
-                if self.revision_prev.length > PREVIOUS_LENGTH and \
-                   text_len < CURR_LENGTH and \
-                   ((text_len-self.revision_prev.length) / self.revision_prev.length) <= CHANGE_PERCENTAGE:
-                    # VANDALISM: CHANGE PERCENTAGE - DELETION
-                    vandalism = True
-
-            if vandalism:
-                # print("---------------------------- FLAG 1")
-                self.revision_curr = self.revision_prev
-                self.spam_ids.append(rev_id)
-                self.spam_hashes.append(rev_hash)
-            else:
-                # Information about the current revision.
-                self.revision_curr = Revision()
-                self.revision_curr.id = rev_id
-                self.revision_curr.length = text_len
-                self.revision_curr.timestamp = revision.timestamp.long_format()
-
-                # Get editor information
-                if revision.user:
-                    user_text = revision.user.text
-                    contributor_name = '' if not user_text or user_text == 'None' else user_text
-                    if revision.user.id is None and contributor_name or revision.user.id == 0:
-                        contributor_id = 0
-                    else:
-                        contributor_id = revision.user.id or ''
-                else:
-                    # Some revisions don't have contributor.
-                    contributor_name = ''
-                    contributor_id = ''
-                editor = contributor_id
-                editor = str(editor) if editor != 0 else '0|{}'.format(contributor_name)
-                self.revision_curr.editor = editor
-
-                # Content within the revision.
-                self.text_curr = text.lower()
-
-                # Perform comparison.
-                vandalism = self.determine_authorship()
-
-                if vandalism:
-                    # print "---------------------------- FLAG 2"
-                    self.revision_curr = self.revision_prev  # skip revision with vandalism in history
-                    self.spam_ids.append(rev_id)
-                    self.spam_hashes.append(rev_hash)
-                else:
-                    # Add the current revision with all the information.
-                    self.revisions.update({self.revision_curr.id: self.revision_curr})
-                    self.ordered_revisions.append(self.revision_curr.id)
-            self.temp = []
+        self._analyse_revisions(self._preprocess(iter_xml_revisions(page), pool), callback)
 
-    def analyse_article(self, page):
+    def analyse_article(self, page, callback=None, pool=None):
         """
         Analyse page in json form.
         :param page: List of revisions. Each revision is a dict and contains metadata and text.
+        :param callback: Optional function which is called with a RevisionResult after each accepted revision.
+        :param pool: Optional multiprocessing Pool. If given, revisions are split and hashed in its processes ahead
+        of the analysis (see pipeline).
+        """
+        self._analyse_revisions(self._preprocess(iter_json_revisions(page), pool), callback)
+
+    def iter_analyse_article_from_xml_dump(self, page, pool=None):
+        """
+        Same as analyse_article_from_xml_dump but yields a RevisionResult right after each accepted revision,
+        so results can be stored while analysis continues.
+        """
+        return self._iter_analyse_revisions(self._preprocess(iter_xml_revisions(page), pool))
+
+    def iter_analyse_article(self, page, pool=None):
+        """
+        Same as analyse_article but yields a RevisionResult right after each accepted revision,
+        so results can be stored while analysis continues.
         """
-        # Iterate over revisions of the article.
-        for revision in page:
-            if 'texthidden' in revision or 'textmissing' in revision:
-                continue
-
-            vandalism = False
-            # Update the information about the previous revision.
-            self.revision_prev = self.revision_curr
-
-            text = revision.get('*', '')
-            rev_id = int(revision['revid'])
-            rev_hash = revision.get('sha1', calculate_hash(text))
-            if rev_hash in self.spam_hashes:
+        return self._iter_analyse_revisions(self._preprocess(iter_json_revisions(page), pool))
+
+    def _preprocess(self, revisions, pool):
+        if pool is None:
+            return revisions
+        return iter_preprocessed(revisions, pool, self.hash_function)
+
+    def _analyse_revisions(self, revisions, callback):
+        if callback is None:
+            for revision in revisions:
+                self.analyse_revision(*revision)
+        else:
+            for result in self._iter_analyse_revisions(revisions):
+                callback(result)
+
+    def _iter_analyse_revisions(self, revisions):
+        # Token ids of the last accepted revision, to compute added and removed tokens.
+        # Analysis can continue from a loaded checkpoint, so they are taken from revision_curr.
+        token_ids_prev = [word.token_id for word in iter_rev_tokens(self.revision_curr)]
+        for revision in revisions:
+            if self.analyse_revision(*revision):
+                result = self.revision_result(token_ids_prev)
+                token_ids_prev = result.token_ids
+                yield result
+
+    def revision_result(self, token_ids_prev):
+        """
+        :param token_ids_prev: Ordered token ids of the previous accepted revision.
+        :return: RevisionResult of the current revision.
+        """
+        revision = self.revision_curr
+        result = RevisionResult()
+        result.rev_id = revision.id
+        result.editor = revision.editor
+        result.timestamp = revision.timestamp
+        for word in iter_rev_tokens(revision):
+            result.token_ids.append(word.token_id)
+            result.origin_rev_ids.append(word.origin_rev_id)
+        token_ids = set(result.token_ids)
+        token_ids_prev_set = set(token_ids_prev)
+        result.added = [token_id for token_id in result.token_ids if token_id not in token_ids_prev_set]
+        result.removed = [token_id for token_id in token_ids_prev if token_id not in token_ids]
+        return result
+
+    def analyse_revision(self, rev_id, text, rev_hash, timestamp, editor, moved=False, preprocessed=None):
+        """
+        Analyse the next revision of the article.
+        :param rev_id: Revision id.
+        :param text: Content of the revision.
+        :param rev_hash: Hash (sha1) of the content.
+        :param timestamp: Timestamp of the revision.
+        :param editor: id if id != 0 else '0|{}'.format(name)
+        :param moved: True if the revision is a minor edit with a comment, e.g. content is moved to another article
+        in good faith. Such revisions are not checked for vandalism by change percentage.
+        :param preprocessed: PreprocessedText of the revision (see pipeline), otherwise text is split here.
+        :return: True if the revision is accepted, False if it is detected as vandalism.
+        """
+        vandalism = False
+        stats = None
+        if self.instrument is not None:
+            stats = RevisionStats(rev_id)
+            start = default_timer()
+            token_id = self.token_id
+        self.stats = stats
+        # Update the information about the previous revision.
+        self.revision_prev = self.revision_curr
+
+        if rev_hash in self.spam_hashes:
+            vandalism = True
+            if stats is not None:
+                stats.vandalism = VANDALISM_SPAM_HASH
+
+        # TODO: spam detection: DELETION
+        text_len = len(text)
+        if not vandalism and not moved:
+            # if content is not moved (flag) to different article in good faith, check for vandalism
+            # if revisions have reached a certain size
+            if self.revision_prev.length > PREVIOUS_LENGTH and \
+               text_len < CURR_LENGTH and \
+               ((text_len-self.revision_prev.length) / self.revision_prev.length) <= CHANGE_PERCENTAGE:
+                # VANDALISM: CHANGE PERCENTAGE - DELETION
                 vandalism = True
+                if stats is not None:
+                    stats.vandalism = VANDALISM_CHANGE_PERCENTAGE
 
-            # TODO: spam detection: DELETION
-            text_len = len(text)
-            if not vandalism and not(revision.get('comment') and 'minor' in revision):
-                # if content is not moved (flag) to different article in good faith, check for vandalism
-                # if revisions have reached a certain size
-                if self.revision_prev.length > PREVIOUS_LENGTH and \
-                   text_len < CURR_LENGTH and \
-                   ((text_len-self.revision_prev.length) / self.revision_prev.length) <= CHANGE_PERCENTAGE:
-                    # VANDALISM: CHANGE PERCENTAGE - DELETION
-                    vandalism = True
-
-            if vandalism:
-                # print("---------------------------- FLAG 1")
-                self.revision_curr = self.revision_prev
-                self.spam_ids.append(rev_id)
-                self.spam_hashes.append(rev_hash)
-            else:
-                # Information about the current revision.
-                self.revision_curr = Revision()
-                self.revision_curr.id = rev_id
-                self.revision_curr.length = text_len
-                self.revision_curr.timestamp = revision['timestamp']
-
-                # Get editor information.
-                # Some revisions don't have editor.
-                contributor_id = revision.get('userid', '')
-                contributor_name = revision.get('user', '')
-                editor = contributor_id
-                editor = str(editor) if editor != 0 else '0|{}'.format(contributor_name)
-                self.revision_curr.editor = editor
-
-                # Content within the revision.
-                self.text_curr = text.lower()
-
-                # Perform comparison.
-                vandalism = self.determine_authorship()
-
-                if vandalism:
-                    # print "---------------------------- FLAG 2"
-                    self.revision_curr = self.revision_prev  # skip revision with vandalism in history
-                    self.spam_ids.append(rev_id)
-                    self.spam_hashes.append(rev_hash)
-                else:
-                    # Add the current revision with all the information.
-                    self.revisions.update({self.revision_curr.id: self.revision_curr})
-                    self.ordered_revisions.append(self.revision_curr.id)
-            self.temp = []
+        if vandalism:
+            # print("---------------------------- FLAG 1")
+            self.revision_curr = self.revision_prev
+            self.spam_ids.add(rev_id)
+            self.spam_hashes.add(rev_hash)
+            if stats is not None:
+                self.emit_stats(start, token_id)
+            return False
+
+        # Information about the current revision.
+        self.revision_curr = Revision()
+        self.revision_curr.id = rev_id
+        self.revision_curr.length = text_len
+        self.revision_curr.timestamp = timestamp
+        self.revision_curr.editor = editor
+
+        # Content within the revision.
+        self.text_curr = text.lower()
+        self.paragraph_values = None
+        if preprocessed is None and rev_hash in self.known_contents:
+            # Same content as a known revision: paragraphs are matched in the same way, but without splitting and
+            # hashing. Texts of paragraphs which are still unmatched are taken from text_curr (see paragraph_value).
+            preprocessed = PreprocessedText([(None, hash_value) for hash_value in self.known_contents[rev_hash]])
+            if stats is not None:
+                stats.revert = True
+        self.preprocessed = preprocessed
+
+        # Perform comparison.
+        vandalism = self.determine_authorship()
+
+        if vandalism:
+            # print "---------------------------- FLAG 2"
+            self.revision_curr = self.revision_prev  # skip revision with vandalism in history
+            self.spam_ids.add(rev_id)
+            self.spam_hashes.add(rev_hash)
+            if stats is not None:
+                stats.vandalism = VANDALISM_TOKEN_DENSITY
+                self.emit_stats(start, token_id)
+            return False
+
+        # Add the current revision with all the information.
+        if not self.keep_revisions:
+            self.revisions.clear()
+        self.revisions.update({self.revision_curr.id: self.revision_curr})
+        self.ordered_revisions.append(self.revision_curr.id)
+        if rev_hash:
+            self.add_known_content(rev_hash, self.revision_curr.ordered_paragraphs)
+        if stats is not None:
+            self.emit_stats(start, token_id)
+        return True
+
+    def add_known_content(self, rev_hash, ordered_paragraphs):
+        if self.keep_revisions:
+            self.known_contents[rev_hash] = ordered_paragraphs
+        else:
+            # latest revision is the last one
+            self.known_contents.pop(rev_hash, None)
+            self.known_contents[rev_hash] = ordered_paragraphs
+            if len(self.known_contents) > KNOWN_CONTENTS_LIMIT:
+                self.known_contents.popitem(last=False)
+
+    def emit_stats(self, start, token_id):
+        """
+        Complete statistics of the analysed revision and pass them to the instrument.
+        :param start: Time when the analysis of the revision started.
+        :param token_id: Next token id when the analysis of the revision started.
+        """
+        stats = self.stats
+        stats.seconds = default_timer() - start
+        stats.tokens_created = self.token_id - token_id
+        self.stats = None
+        self.instrument(stats)
 
     def determine_authorship(self):
         # Containers for unmatched paragraphs and sentences in both revisions.
@@ -213,16 +353,30 @@ class Wikiwho:
         matched_words_prev = []
         possible_vandalism = False
         vandalism = False
+        stats = self.stats
+        # Start a new epoch, so structures matched in previous analyses are not matched anymore.
+        self.epoch += 1
 
         try:
             # Analysis of the paragraphs in the current revision.
+            if stats is not None:
+                start = default_timer()
             unmatched_paragraphs_curr, unmatched_paragraphs_prev, matched_paragraphs_prev = \
                 self.analyse_paragraphs_in_revision()
+            if stats is not None:
+                stats.paragraphs_seconds = default_timer() - start
+                self.paragraph_stats(matched_paragraphs_prev)
 
             # Analysis of the sentences in the unmatched paragraphs of the current revision.
             if unmatched_paragraphs_curr:
+                if stats is not None:
+                    start = default_timer()
                 unmatched_sentences_curr, unmatched_sentences_prev, matched_sentences_prev, total_sentences = \
                     self.analyse_sentences_in_paragraphs(unmatched_paragraphs_curr, unmatched_paragraphs_prev)
+                if stats is not None:
+                    stats.sentences_seconds = default_timer() - start
+                    stats.sentences = total_sentences
+                    self.sentence_stats(matched_sentences_prev, unmatched_paragraphs_prev)
 
                 # TODO: spam detection
                 if len(unmatched_paragraphs_curr) / len(self.revision_curr.ordered_paragraphs) > UNMATCHED_PARAGRAPH:
@@ -231,78 +385,61 @@ class Wikiwho:
 
                 # Analysis of words in unmatched sentences (diff of both texts).
                 if unmatched_sentences_curr:
+                    if stats is not None:
+                        start = default_timer()
                     matched_words_prev, vandalism = self.analyse_words_in_sentences(unmatched_sentences_curr,
                                                                                     unmatched_sentences_prev,
                                                                                     possible_vandalism)
+                    if stats is not None:
+                        stats.words_seconds = default_timer() - start
         except Exception:
             # Error occurred during analysing the current revision
             # Hold the last successfully processed revision.
+            # Matched structures are reset by starting a new epoch in the next analysis.
             self.revision_curr = self.revision_prev
-            # Reset matched structures from old revisions.
-            for matched_paragraph in matched_paragraphs_prev:
-                matched_paragraph.matched = False
-                for sentence_hash in matched_paragraph.sentences:
-                    for sentence in matched_paragraph.sentences[sentence_hash]:
-                        sentence.matched = False
-                        for word_prev in sentence.words:
-                            word_prev.matched = False
-            for matched_sentence in matched_sentences_prev:
-                matched_sentence.matched = False
-                for word_prev in matched_sentence.words:
-                    word_prev.matched = False
-            for matched_word in matched_words_prev:
-                matched_word.matched = False
             raise
+        finally:
+            # words are marked only during the analysis, unmarked sentences of the previous revision are released
+            self.unmarked_sentences = []
+            self.lazy_marking = True
 
         if not vandalism:
             # Add the information of 'deletion' to words
             for unmatched_sentence in unmatched_sentences_prev:
                 for word_prev in unmatched_sentence.words:
-                    if not word_prev.matched:
-                        word_prev.outbound.append(self.revision_curr.id)
+                    if word_prev.matched != self.epoch:
+                        word_prev.add_outbound(self.revision_curr.id)
             if not unmatched_sentences_prev:
                 # if all current paragraphs are matched
                 for unmatched_paragraph in unmatched_paragraphs_prev:
                     for sentence_hash in unmatched_paragraph.sentences:
                         for sentence in unmatched_paragraph.sentences[sentence_hash]:
+                            if sentence.matched == self.epoch:
+                                # all words are matched, they might be not marked yet (see mark_words)
+                                continue
                             for word_prev in sentence.words:
-                                if not word_prev.matched:
-                                    word_prev.outbound.append(self.revision_curr.id)
-
-        # Reset matched structures from old revisions. And update inbound and last used info of matched words.
-        for matched_paragraph in matched_paragraphs_prev:
-            matched_paragraph.matched = False
-            for sentence_hash in matched_paragraph.sentences:
-                for sentence in matched_paragraph.sentences[sentence_hash]:
-                    sentence.matched = False
-                    for word_prev in sentence.words:
-                        # first update inbound and last used info of matched words of all previous revisions
-                        if not vandalism and word_prev.matched and \
-                                (not word_prev.outbound or word_prev.outbound[-1] != self.revision_curr.id):
+                                if word_prev.matched != self.epoch:
+                                    word_prev.add_outbound(self.revision_curr.id)
+
+            # Update inbound and last used info of matched words of all previous revisions.
+            # Each matched word is in exactly one of these containers and none of them is deleted.
+            for matched_paragraph in matched_paragraphs_prev:
+                for sentence_hash in matched_paragraph.sentences:
+                    for sentence in matched_paragraph.sentences[sentence_hash]:
+                        for word_prev in sentence.words:
                             if word_prev.last_rev_id != self.revision_prev.id:
-                                word_prev.inbound.append(self.revision_curr.id)
+                                word_prev.add_inbound(self.revision_curr.id)
                             word_prev.last_rev_id = self.revision_curr.id
-                        # reset
-                        word_prev.matched = False
-        for matched_sentence in matched_sentences_prev:
-            matched_sentence.matched = False
-            for word_prev in matched_sentence.words:
-                # first update inbound and last used info of matched words of all previous revisions
-                if not vandalism and word_prev.matched and \
-                        (not word_prev.outbound or word_prev.outbound[-1] != self.revision_curr.id):
+            for matched_sentence in matched_sentences_prev:
+                for word_prev in matched_sentence.words:
                     if word_prev.last_rev_id != self.revision_prev.id:
-                        word_prev.inbound.append(self.revision_curr.id)
-                    word_prev.last_rev_id = self.revision_curr.id
-                # reset
-                word_prev.matched = False
-        for matched_word in matched_words_prev:
-            # first update last used info of matched prev words
-            # there is no inbound chance because we only diff with words of previous revision
-            if not vandalism and word_prev.matched:
-                if not word_prev.outbound or word_prev.outbound[-1] != self.revision_curr.id:
+                        word_prev.add_inbound(self.revision_curr.id)
                     word_prev.last_rev_id = self.revision_curr.id
-            # reset
-            matched_word.matched = False
+            for word_prev in matched_words_prev:
+                # words matched in diff are from previous revision, so there is actually no inbound chance
+                if word_prev.last_rev_id != self.revision_prev.id:
+                    word_prev.add_inbound(self.revision_curr.id)
+                word_prev.last_rev_id = self.revision_curr.id
 
         if not vandalism:
             # Add the new paragraphs to hash table of paragraphs.
@@ -324,53 +461,101 @@ class Wikiwho:
 
         return vandalism
 
+    def paragraph_stats(self, matched_paragraphs_prev):
+        """Count paragraphs of the current revision and where matched paragraphs are found."""
+        stats = self.stats
+        stats.paragraphs = len(self.revision_curr.ordered_paragraphs)
+        # A paragraph is matched via the hash table only if no paragraph of the previous revision with the same
+        # hash could be matched, so paragraphs of the previous revision are always matched in the previous revision.
+        paragraphs_prev = set(id(p) for p in iter_ordered(self.revision_prev.ordered_paragraphs,
+                                                          self.revision_prev.paragraphs))
+        stats.paragraphs_matched_prev = sum(1 for p in matched_paragraphs_prev if id(p) in paragraphs_prev)
+        stats.paragraphs_matched_ht = len(matched_paragraphs_prev) - stats.paragraphs_matched_prev
+
+    def sentence_stats(self, matched_sentences_prev, unmatched_paragraphs_prev):
+        """Count where matched sentences are found, as in paragraph_stats."""
+        stats = self.stats
+        sentences_prev = set(id(s) for p in unmatched_paragraphs_prev for sentences in p.sentences.values()
+                             for s in sentences)
+        stats.sentences_matched_prev = sum(1 for s in matched_sentences_prev if id(s) in sentences_prev)
+        stats.sentences_matched_ht = len(matched_sentences_prev) - stats.sentences_matched_prev
+
+    def mark_words(self, sentences):
+        """
+        Set words of matched sentences as matched.
+        Words of different paragraphs and sentences of a revision are distinct objects. So as long as only structures
+        of the previous revision are matched, none of their words can be matched twice and marking is postponed
+        until a structure from an older revision has to be checked (see stop_lazy_marking).
+        """
+        if self.lazy_marking:
+            self.unmarked_sentences.extend(sentences)
+        else:
+            for sentence in sentences:
+                for word in sentence.words:
+                    word.matched = self.epoch
+
+    def stop_lazy_marking(self):
+        """
+        Set postponed words as matched. From now on words are marked immediately and candidates from the previous
+        revision are checked word by word, because they can share words with matched structures of older revisions.
+        """
+        if self.lazy_marking:
+            self.lazy_marking = False
+            self.mark_words(self.unmarked_sentences)
+            self.unmarked_sentences = []
+
     def analyse_paragraphs_in_revision(self):
         # Containers for unmatched and matched paragraphs.
         unmatched_paragraphs_curr = []
         unmatched_paragraphs_prev = []
         matched_paragraphs_prev = []
 
-        # Split the text of the current into paragraphs.
-        paragraphs = split_into_paragraphs(self.text_curr)
+        # Split the text of the current into non-empty paragraphs and calculate hash values.
+        if self.preprocessed is None:
+            paragraphs = hash_paragraphs(self.text_curr, self.calculate_hash)
+        else:
+            paragraphs = self.preprocessed.paragraphs
+
+        # {hash: index} of candidate lists, to look up repeated paragraphs (e.g. {{reflist}}, |-) of this revision
+        # without checking the same candidates again. Candidates before the index are matched in this analysis.
+        paragraphs_prev_start = {}
+        paragraphs_ht_start = {}
 
         # Iterate over the paragraphs of the current version.
-        for paragraph in paragraphs:
-            # Build Paragraph structure and calculate hash value.
-            paragraph = paragraph.strip()
-            if not paragraph:
-                # dont track empty lines
-                continue
-            # TODO should we clean whitespaces in paragraph level?
-            # paragraph = ' '.join(split_into_tokens(paragraph))
-            hash_curr = calculate_hash(paragraph)
+        for paragraph, hash_curr in paragraphs:
             matched_curr = False
 
             # If the paragraph is in the previous revision,
             # update the authorship information and mark both paragraphs as matched (also in HT).
-            for paragraph_prev in self.revision_prev.paragraphs.get(hash_curr, []):
-                if not paragraph_prev.matched:
+            paragraphs_prev = self.revision_prev.paragraphs.get(hash_curr, [])
+            start = skip_matched(paragraphs_prev, paragraphs_prev_start.get(hash_curr, 0), self.epoch)
+            paragraphs_prev_start[hash_curr] = start
+            for i in range(start, len(paragraphs_prev)):
+                paragraph_prev = paragraphs_prev[i]
+                if paragraph_prev.matched != self.epoch:
                     matched_one = False
                     matched_all = True
-                    for h in paragraph_prev.sentences:
-                        for s_prev in paragraph_prev.sentences[h]:
-                            for w_prev in s_prev.words:
-                                if w_prev.matched:
-                                    matched_one = True
-                                else:
-                                    matched_all = False
+                    if not self.lazy_marking:
+                        # words of this paragraph can be already matched via a structure of an older revision
+                        for h in paragraph_prev.sentences:
+                            for s_prev in paragraph_prev.sentences[h]:
+                                for w_prev in s_prev.words:
+                                    if w_prev.matched == self.epoch:
+                                        matched_one = True
+                                    else:
+                                        matched_all = False
 
                     if not matched_one:
                         # if there is not any already matched prev word, so set them all as matched
                         matched_curr = True
-                        paragraph_prev.matched = True
+                        paragraph_prev.matched = self.epoch
                         matched_paragraphs_prev.append(paragraph_prev)
 
                         # Set all sentences and words of this paragraph as matched
                         for hash_sentence_prev in paragraph_prev.sentences:
                             for sentence_prev in paragraph_prev.sentences[hash_sentence_prev]:
-                                sentence_prev.matched = True
-                                for word_prev in sentence_prev.words:
-                                    word_prev.matched = True
+                                sentence_prev.matched = self.epoch
+                            self.mark_words(paragraph_prev.sentences[hash_sentence_prev])
 
                         # Add paragraph to current revision.
                         if hash_curr in self.revision_curr.paragraphs:
@@ -381,23 +566,30 @@ class Wikiwho:
                         break
                     elif matched_all:
                         # if all prev words in this paragraph are already matched
-                        paragraph_prev.matched = True
+                        paragraph_prev.matched = self.epoch
                         # for hash_sentence_prev in paragraph_prev.sentences:
                         #     for sentence_prev in paragraph_prev.sentences[hash_sentence_prev]:
-                        #         sentence_prev.matched = True
-                        matched_paragraphs_prev.append(paragraph_prev)
+                        #         sentence_prev.matched = self.epoch
 
             # If the paragraph is not in the previous revision, but it is in an older revision
             # update the authorship information and mark both paragraphs as matched.
-            if not matched_curr:
-                for paragraph_prev in self.paragraphs_ht.get(hash_curr, []):
-                    if not paragraph_prev.matched:
+            if not matched_curr and hash_curr in self.paragraphs_ht:
+                self.stop_lazy_marking()
+                # Here also candidates which are rejected are not checked again for this revision: they stay rejected,
+                # because matched words stay matched. And marking them as matched (matched_all) would change nothing,
+                # candidates of the previous revision are checked again in the loop above anyway.
+                paragraphs_ht = self.paragraphs_ht[hash_curr]
+                start = paragraphs_ht_start.get(hash_curr, 0)
+                paragraphs_ht_start[hash_curr] = len(paragraphs_ht)
+                for i in range(start, len(paragraphs_ht)):
+                    paragraph_prev = paragraphs_ht[i]
+                    if paragraph_prev.matched != self.epoch:
                         matched_one = False
                         matched_all = True
                         for h in paragraph_prev.sentences:
                             for s_prev in paragraph_prev.sentences[h]:
                                 for w_prev in s_prev.words:
-                                    if w_prev.matched:
+                                    if w_prev.matched == self.epoch:
                                         matched_one = True
                                     else:
                                         matched_all = False
@@ -405,15 +597,15 @@ class Wikiwho:
                         if not matched_one:
                             # if there is not any already matched prev word, so set them all as matched
                             matched_curr = True
-                            paragraph_prev.matched = True
+                            paragraph_prev.matched = self.epoch
                             matched_paragraphs_prev.append(paragraph_prev)
+                            paragraphs_ht_start[hash_curr] = i + 1
 
                             # Set all sentences and words of this paragraph as matched
                             for hash_sentence_prev in paragraph_prev.sentences:
                                 for sentence_prev in paragraph_prev.sentences[hash_sentence_prev]:
-                                    sentence_prev.matched = True
-                                    for word_prev in sentence_prev.words:
-                                        word_prev.matched = True
+                                    sentence_prev.matched = self.epoch
+                                self.mark_words(paragraph_prev.sentences[hash_sentence_prev])
 
                             # Add paragraph to current revision.
                             if hash_curr in self.revision_curr.paragraphs:
@@ -424,11 +616,10 @@ class Wikiwho:
                             break
                         elif matched_all:
                             # if all prev words in this paragraph are already matched
-                            paragraph_prev.matched = True
+                            paragraph_prev.matched = self.epoch
                             # for hash_sentence_prev in paragraph_prev.sentences:
                             #     for sentence_prev in paragraph_prev.sentences[hash_sentence_prev]:
-                            #         sentence_prev.matched = True
-                            matched_paragraphs_prev.append(paragraph_prev)
+                            #         sentence_prev.matched = self.epoch
 
             # If the paragraph did not match with previous revisions,
             # add to container of unmatched paragraphs for further analysis.
@@ -445,15 +636,8 @@ class Wikiwho:
                 unmatched_paragraphs_curr.append(paragraph_curr)
 
         # Identify unmatched paragraphs in previous revision for further analysis.
-        for paragraph_prev_hash in self.revision_prev.ordered_paragraphs:
-            if len(self.revision_prev.paragraphs[paragraph_prev_hash]) > 1:
-                s = 'p-{}-{}'.format(self.revision_prev, paragraph_prev_hash)
-                self.temp.append(s)
-                count = self.temp.count(s)
-                paragraph_prev = self.revision_prev.paragraphs[paragraph_prev_hash][count - 1]
-            else:
-                paragraph_prev = self.revision_prev.paragraphs[paragraph_prev_hash][0]
-            if not paragraph_prev.matched:
+        for paragraph_prev in iter_ordered(self.revision_prev.ordered_paragraphs, self.revision_prev.paragraphs):
+            if paragraph_prev.matched != self.epoch:
                 unmatched_paragraphs_prev.append(paragraph_prev)
 
         return unmatched_paragraphs_curr, unmatched_paragraphs_prev, matched_paragraphs_prev
@@ -464,78 +648,96 @@ class Wikiwho:
         unmatched_sentences_prev = []
         matched_sentences_prev = []
         total_sentences = 0
+        preprocessed_sentences = self.preprocessed.sentences if self.preprocessed is not None else {}
+
+        # Sentences of unmatched paragraphs of the previous revision by hash, in order of paragraphs.
+        sentences_prev = {}  # {sentence_hash: [sentence_obj, ..]}
+        for paragraph_prev in unmatched_paragraphs_prev:
+            for hash_prev, sentences in paragraph_prev.sentences.items():
+                if hash_prev in sentences_prev:
+                    sentences_prev[hash_prev].extend(sentences)
+                else:
+                    # copy, lists of paragraphs must not be extended
+                    sentences_prev[hash_prev] = list(sentences)
+        # {hash: index} of candidate lists, as in analyse_paragraphs_in_revision
+        sentences_prev_start = {}
+        sentences_ht_start = {}
 
         # Iterate over the unmatched paragraphs of the current revision.
         for paragraph_curr in unmatched_paragraphs_curr:
-            # Split the current paragraph into sentences.
-            sentences = split_into_sentences(paragraph_curr.value)
+            # Split the current paragraph into non-empty sentences and calculate hash values.
+            sentences = preprocessed_sentences.get(paragraph_curr.hash_value)
+            if sentences is None:
+                paragraph = paragraph_curr.value
+                if paragraph is None:
+                    # text is not sent by the pipeline, because the paragraph was probably matched
+                    paragraph = self.paragraph_value(paragraph_curr.hash_value)
+                sentences = hash_sentences(paragraph, self.calculate_hash)
             # Iterate over the sentences of the current paragraph
-            for sentence in sentences:
-                # Create the Sentence structure.
-                sentence = sentence.strip()
-                if not sentence:
-                    # dont track empty lines
-                    continue
-                sentence = ' '.join(split_into_tokens(sentence))  # here whitespaces in the sentence are cleaned
-                hash_curr = calculate_hash(sentence)  # then hash values is calculated
+            for sentence, hash_curr in sentences:
                 matched_curr = False
                 total_sentences += 1
 
-                # Iterate over the unmatched paragraphs from the previous revision.
-                for paragraph_prev in unmatched_paragraphs_prev:
-                    for sentence_prev in paragraph_prev.sentences.get(hash_curr, []):
-                        if not sentence_prev.matched:
-                            matched_one = False
-                            matched_all = True
+                # Iterate over the sentences of unmatched paragraphs from the previous revision.
+                candidates = sentences_prev.get(hash_curr, ())
+                start = skip_matched(candidates, sentences_prev_start.get(hash_curr, 0), self.epoch)
+                sentences_prev_start[hash_curr] = start
+                for i in range(start, len(candidates)):
+                    sentence_prev = candidates[i]
+                    if sentence_prev.matched != self.epoch:
+                        matched_one = False
+                        matched_all = True
+                        if not self.lazy_marking:
+                            # words of this sentence can be already matched via a structure of an older revision
                             for word_prev in sentence_prev.words:
-                                if word_prev.matched:
+                                if word_prev.matched == self.epoch:
                                     matched_one = True
                                 else:
                                     matched_all = False
 
-                            if not matched_one:
-                                # if there is not any already matched prev word, so set them all as matched
-                                sentence_prev.matched = True
-                                matched_curr = True
-                                matched_sentences_prev.append(sentence_prev)
-
-                                for word_prev in sentence_prev.words:
-                                    word_prev.matched = True
+                        if not matched_one:
+                            # if there is not any already matched prev word, so set them all as matched
+                            sentence_prev.matched = self.epoch
+                            matched_curr = True
+                            matched_sentences_prev.append(sentence_prev)
+                            self.mark_words([sentence_prev])
 
-                                # Add the sentence information to the paragraph.
-                                if hash_curr in paragraph_curr.sentences:
-                                    paragraph_curr.sentences[hash_curr].append(sentence_prev)
-                                else:
-                                    paragraph_curr.sentences.update({sentence_prev.hash_value: [sentence_prev]})
-                                paragraph_curr.ordered_sentences.append(sentence_prev.hash_value)
-                                break
-                            elif matched_all:
-                                # if all prev words in this sentence are already matched
-                                sentence_prev.matched = True
-                                matched_sentences_prev.append(sentence_prev)
-                    if matched_curr:
-                        break
+                            # Add the sentence information to the paragraph.
+                            if hash_curr in paragraph_curr.sentences:
+                                paragraph_curr.sentences[hash_curr].append(sentence_prev)
+                            else:
+                                paragraph_curr.sentences.update({sentence_prev.hash_value: [sentence_prev]})
+                            paragraph_curr.ordered_sentences.append(sentence_prev.hash_value)
+                            break
+                        elif matched_all:
+                            # if all prev words in this sentence are already matched
+                            sentence_prev.matched = self.epoch
 
                 # Iterate over the hash table of sentences from old revisions.
-                if not matched_curr:
-                    for sentence_prev in self.sentences_ht.get(hash_curr, []):
-                        if not sentence_prev.matched:
+                if not matched_curr and hash_curr in self.sentences_ht:
+                    self.stop_lazy_marking()
+                    # rejected candidates are not checked again, as in paragraphs_ht
+                    sentences_ht = self.sentences_ht[hash_curr]
+                    start = sentences_ht_start.get(hash_curr, 0)
+                    sentences_ht_start[hash_curr] = len(sentences_ht)
+                    for i in range(start, len(sentences_ht)):
+                        sentence_prev = sentences_ht[i]
+                        if sentence_prev.matched != self.epoch:
                             matched_one = False
                             matched_all = True
                             for word_prev in sentence_prev.words:
-                                if word_prev.matched:
+                                if word_prev.matched == self.epoch:
                                     matched_one = True
                                 else:
                                     matched_all = False
 
                             if not matched_one:
                                 # if there is not any already matched prev word, so set them all as matched
-                                sentence_prev.matched = True
+                                sentence_prev.matched = self.epoch
                                 matched_curr = True
                                 matched_sentences_prev.append(sentence_prev)
-
-                                for word_prev in sentence_prev.words:
-                                    word_prev.matched = True
+                                sentences_ht_start[hash_curr] = i + 1
+                                self.mark_words([sentence_prev])
 
                                 # Add the sentence information to the paragraph.
                                 if hash_curr in paragraph_curr.sentences:
@@ -546,8 +748,7 @@ class Wikiwho:
                                 break
                             elif matched_all:
                                 # if all prev words in this sentence are already matched
-                                sentence_prev.matched = True
-                                matched_sentences_prev.append(sentence_prev)
+                                sentence_prev.matched = self.epoch
 
                 # If the sentence did not match,
                 # then include in the container of unmatched sentences for further analysis.
@@ -565,31 +766,34 @@ class Wikiwho:
 
         # Identify the unmatched sentences in the previous paragraph revision.
         for paragraph_prev in unmatched_paragraphs_prev:
-            for sentence_prev_hash in paragraph_prev.ordered_sentences:
-                if len(paragraph_prev.sentences[sentence_prev_hash]) > 1:
-                    s = 's-{}-{}'.format(paragraph_prev, sentence_prev_hash)
-                    self.temp.append(s)
-                    count = self.temp.count(s)
-                    sentence_prev = paragraph_prev.sentences[sentence_prev_hash][count - 1]
-                else:
-                    sentence_prev = paragraph_prev.sentences[sentence_prev_hash][0]
-                if not sentence_prev.matched:
+            for sentence_prev in iter_ordered(paragraph_prev.ordered_sentences, paragraph_prev.sentences):
+                if sentence_prev.matched != self.epoch:
                     unmatched_sentences_prev.append(sentence_prev)
-                    # to reset 'matched words in analyse_words_in_sentences' of unmatched paragraphs and sentences
-                    sentence_prev.matched = True
-                    matched_sentences_prev.append(sentence_prev)
 
         return unmatched_sentences_curr, unmatched_sentences_prev, matched_sentences_prev, total_sentences
 
+    def paragraph_value(self, hash_value):
+        """
+        :return: Text of the paragraph with hash_value in the current revision. The text is split and hashed
+        only once per revision, not once per paragraph.
+        """
+        if self.paragraph_values is None:
+            self.paragraph_values = paragraph_values = {}
+            for paragraph, hash_curr in hash_paragraphs(self.text_curr, self.calculate_hash):
+                if hash_curr not in paragraph_values:
+                    paragraph_values[hash_curr] = paragraph
+        return self.paragraph_values.get(hash_value)
+
     def analyse_words_in_sentences(self, unmatched_sentences_curr, unmatched_sentences_prev, possible_vandalism):
         matched_words_prev = []
         unmatched_words_prev = []
+        intern = self.vocabulary.intern
 
         # Split sentences into words.
         text_prev = []
         for sentence_prev in unmatched_sentences_prev:
             for word_prev in sentence_prev.words:
-                if not word_prev.matched:
+                if word_prev.matched != self.epoch:
                     text_prev.append(word_prev.value)
                     unmatched_words_prev.append(word_prev)
 
@@ -607,11 +811,21 @@ class Wikiwho:
         # spam detection.
         if possible_vandalism:
             token_density = compute_avg_word_freq(text_curr)
+            if self.stats is not None:
+                self.stats.token_density = token_density
             if token_density > TOKEN_DENSITY_LIMIT:
                 return matched_words_prev, possible_vandalism
             else:
                 possible_vandalism = False
 
+        # Tokens become values of the vocabulary: the diff compares identical objects for tokens which are in both
+        # revisions (previous words have vocabulary values) and new words share them.
+        text_curr = []
+        for sentence_curr in unmatched_sentences_curr:
+            words = sentence_curr.splitted
+            words[:] = [intern(word) for word in words]
+            text_curr.extend(words)
+
         # Edit consists of adding new content, not changing/removing content
         if not text_prev:
             for sentence_curr in unmatched_sentences_curr:
@@ -628,62 +842,40 @@ class Wikiwho:
                     self.tokens.append(word_curr)
             return matched_words_prev, possible_vandalism
 
-        d = Differ()
-        diff = list(d.compare(text_prev, text_curr))
+        if self.stats is not None:
+            self.stats.diff_tokens_prev = len(text_prev)
+            self.stats.diff_tokens_curr = len(text_curr)
+        diff = self.diff_backend.compare(text_prev, text_curr)
+        if self.stats is not None:
+            self.stats.diff_guarded = getattr(self.diff_backend, 'guarded', False)
+            self.stats.diff_fallbacks = getattr(self.diff_backend, 'fallbacks', 0)
+        # Resolve the diff in one ordered walk: positions of matched previous words or None for new words.
+        matches, deleted = resolve(diff, text_curr)
+        for pos in deleted:
+            # deleted
+            word_prev = unmatched_words_prev[pos]
+            word_prev.matched = self.epoch
+            word_prev.add_outbound(self.revision_curr.id)
+
+        matches = iter(matches)
         for sentence_curr in unmatched_sentences_curr:
             for word in sentence_curr.splitted:
-                curr_matched = False
-                pos = 0
-                diff_len = len(diff)
-                while pos < diff_len:
-                    word_diff = diff[pos]
-                    if word == word_diff[2:]:
-                        if word_diff[0] == ' ':
-                            # match
-                            for word_prev in unmatched_words_prev:
-                                if not word_prev.matched and word_prev.value == word:
-
-                                    word_prev.matched = True
-                                    curr_matched = True
-                                    sentence_curr.words.append(word_prev)
-                                    matched_words_prev.append(word_prev)
-                                    diff[pos] = ''
-                                    pos = diff_len + 1
-                                    break
-                        elif word_diff[0] == '-':
-                            # deleted
-                            for word_prev in unmatched_words_prev:
-                                if not word_prev.matched and word_prev.value == word:
-                                    word_prev.matched = True
-                                    word_prev.outbound.append(self.revision_curr.id)
-                                    matched_words_prev.append(word_prev)
-                                    diff[pos] = ''
-                                    break
-                        elif word_diff[0] == '+':
-                            # a new added word
-                            curr_matched = True
-                            word_curr = Word()
-                            word_curr.value = word
-                            word_curr.token_id = self.token_id
-                            word_curr.origin_rev_id = self.revision_curr.id
-                            word_curr.last_rev_id = self.revision_curr.id
-
-                            sentence_curr.words.append(word_curr)
-                            self.token_id += 1
-                            self.revision_curr.original_adds += 1
-                            self.tokens.append(word_curr)
-                            diff[pos] = ''
-                            pos = diff_len + 1
-                    pos += 1
-
-                if not curr_matched:
+                pos = next(matches)
+                if pos is not None:
+                    # match
+                    word_prev = unmatched_words_prev[pos]
+                    word_prev.matched = self.epoch
+                    sentence_curr.words.append(word_prev)
+                    matched_words_prev.append(word_prev)
+                else:
+                    # a new added word
                     word_curr = Word()
                     word_curr.value = word
                     word_curr.token_id = self.token_id
                     word_curr.origin_rev_id = self.revision_curr.id
                     word_curr.last_rev_id = self.revision_curr.id
-                    sentence_curr.words.append(word_curr)
 
+                    sentence_curr.words.append(word_curr)
                     self.token_id += 1
                     self.revision_curr.original_adds += 1
                     self.tokens.append(word_curr)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Authorship of the synthetic histories of benchmarks.histories must stay the same as with the original
+implementation of WikiWho, which data/authorship.json.gz was generated with (40 revisions of each history, seed 1):
+tokens (token_id, origin_rev_id, last_rev_id, inbound, outbound), token ids of each revision and spam_ids.
+Token ids of revisions are stored as runs [first token id, number of tokens].
+
+If authorship is changed on purpose, the data is written again with:
+
+    python -c "from tests.test_authorship import write_golden; write_golden()"
+"""
+from __future__ import unicode_literals
+
+import gzip
+import io
+import json
+import os
+import unittest
+from multiprocessing import Pool
+
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.utils import iter_rev_tokens
+from WikiWho.wikiwho import Wikiwho
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'data', 'authorship.json.gz')
+REVISIONS = 40
+SEED = 1
+
+
+def runs(token_ids):
+    """:return: [[first token id, number of tokens], ..] of consecutive token ids."""
+    result = []
+    for token_id in token_ids:
+        if result and result[-1][0] + result[-1][1] == token_id:
+            result[-1][1] += 1
+        else:
+            result.append([token_id, 1])
+    return result
+
+
+def authorship(name, pool=None, **kwargs):
+    """Analyse the history and return its authorship in the form of golden data."""
+    wikiwho = Wikiwho(name, **kwargs)
+    results = []
+    wikiwho.analyse_article(HISTORIES[name](REVISIONS, seed=SEED), pool=pool,
+                            callback=lambda result: results.append([result.rev_id, runs(result.token_ids)]))
+    if wikiwho.keep_revisions:
+        # tokens of revisions which are kept must be the same as in results
+        revisions = [[rev_id, runs(word.token_id for word in iter_rev_tokens(wikiwho.revisions[rev_id]))]
+                     for rev_id in wikiwho.ordered_revisions]
+        assert revisions == results, name
+    return {
+        'tokens': [[word.token_id, word.origin_rev_id, word.last_rev_id, list(word.inbound), list(word.outbound)]
+                   for word in wikiwho.tokens],
+        'revisions': results,
+        'spam_ids': list(wikiwho.spam_ids),
+    }
+
+
+def write_golden(path=GOLDEN_PATH):
+    golden = dict((name, authorship(name)) for name in sorted(HISTORIES))
+    with gzip.GzipFile(path, 'wb', compresslevel=9, mtime=0) as f:
+        f.write(json.dumps(golden, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+
+class TestAuthorship(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with gzip.open(GOLDEN_PATH, 'rb') as f:
+            cls.golden = json.loads(io.TextIOWrapper(f, encoding='utf-8').read())
+
+    def assert_golden(self, pool=None, **kwargs):
+        self.assertEqual(sorted(self.golden), sorted(HISTORIES))
+        for name in sorted(HISTORIES):
+            expected = self.golden[name]
+            result = authorship(name, pool=pool, **kwargs)
+            for key in ('tokens', 'revisions', 'spam_ids'):
+                if result[key] != expected[key]:
+                    # first difference only, a diff of whole lists takes long
+                    for i, (value, expected_value) in enumerate(zip(result[key], expected[key])):
+                        if value != expected_value:
+                            break
+                    else:
+                        i += 1
+                        value = result[key][i:i + 1]
+                        expected_value = expected[key][i:i + 1]
+                    self.fail('{} of {} history ({}) differ at index {}: {!r} != {!r}'.format(
+                        key, name, kwargs, i, value, expected_value))
+
+    def test_default(self):
+        self.assert_golden()
+
+    def test_hash_functions(self):
+        for hash_function in ('blake2b', 'blake2b-int'):
+            self.assert_golden(hash_function=hash_function)
+
+    def test_keep_revisions_false(self):
+        self.assert_golden(keep_revisions=False)
+
+    def test_diff_backends(self):
+        for diff_backend in ('myers', 'check'):
+            self.assert_golden(diff_backend=diff_backend)
+
+    def test_pool(self):
+        pool = Pool(2)
+        try:
+            self.assert_golden(pool=pool)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
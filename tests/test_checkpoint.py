@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+An analysis which is dumped into a checkpoint, loaded and continued must give the same result as an uninterrupted
+analysis.
+
+data/checkpoint_v1.wwc and data/checkpoint_v2.wwc are checkpoints of the first 20 revisions of the vandalism
+history of benchmarks.histories (40 revisions, seed 1), written by format versions 1 and 2 (with blake2b-int
+hash function).
+"""
+from __future__ import unicode_literals
+
+import io
+import os
+import unittest
+
+from WikiWho import checkpoint
+from WikiWho.benchmarks.histories import HISTORIES
+from WikiWho.utils import iter_rev_tokens
+from WikiWho.wikiwho import Wikiwho
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+REVISIONS = 40
+SEED = 1
+
+
+def revisions_of(name):
+    return HISTORIES[name](REVISIONS, seed=SEED)
+
+
+def dump_and_load(wikiwho, **kwargs):
+    fp = io.BytesIO()
+    checkpoint.dump(wikiwho, fp)
+    fp.seek(0)
+    return checkpoint.load(fp, **kwargs)
+
+
+def analyse(wikiwho, revisions, results):
+    wikiwho.analyse_article(revisions, callback=lambda result: results.append((result.rev_id, result.token_ids)))
+    return wikiwho
+
+
+def state(wikiwho, results):
+    """Authorship of tokens, token ids of analysed revisions and spam of an analysis."""
+    tokens = [(word.token_id, word.value, word.origin_rev_id, word.last_rev_id, list(word.inbound),
+               list(word.outbound)) for word in wikiwho.tokens]
+    if wikiwho.keep_revisions:
+        revisions = [(rev_id, [word.token_id for word in iter_rev_tokens(wikiwho.revisions[rev_id])])
+                     for rev_id in wikiwho.ordered_revisions]
+        assert revisions == results
+    return tokens, results, wikiwho.ordered_revisions, list(wikiwho.spam_ids), list(wikiwho.spam_hashes), \
+        wikiwho.token_id
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def assert_resumes(self, name, cut_points, **kwargs):
+        revisions = revisions_of(name)
+        results = []
+        expected = state(analyse(Wikiwho(name, **kwargs), revisions, results), results)
+
+        results = []
+        wikiwho = Wikiwho(name, **kwargs)
+        start = 0
+        for cut_point in cut_points:
+            analyse(wikiwho, revisions[start:cut_point], results)
+            wikiwho = dump_and_load(wikiwho)
+            start = cut_point
+        analyse(wikiwho, revisions[start:], results)
+        self.assertEqual(state(wikiwho, results), expected, '{} cut at {}, {}'.format(name, cut_points, kwargs))
+        for key, value in kwargs.items():
+            self.assertEqual(getattr(wikiwho, key), value)
+
+    def test_cut_points(self):
+        for name in sorted(HISTORIES):
+            for cut_point in (1, 13, 30):
+                self.assert_resumes(name, [cut_point])
+
+    def test_several_cut_points(self):
+        for name in ('revert', 'vandalism'):
+            self.assert_resumes(name, range(1, REVISIONS, 3))
+
+    def test_hash_functions(self):
+        for hash_function in ('md5', 'blake2b', 'blake2b-int'):
+            for name in ('revert', 'table'):
+                self.assert_resumes(name, [10, 25], hash_function=hash_function)
+
+    def test_keep_revisions_false(self):
+        for name in sorted(HISTORIES):
+            self.assert_resumes(name, [10, 25], keep_revisions=False)
+
+    def test_other_hash_function_is_rejected(self):
+        wikiwho = analyse(Wikiwho('revert'), revisions_of('revert')[:5], [])
+        with self.assertRaises(checkpoint.CheckpointError):
+            dump_and_load(wikiwho, hash_function='blake2b')
+
+    def test_not_a_checkpoint(self):
+        with self.assertRaises(checkpoint.CheckpointError):
+            checkpoint.load(io.BytesIO(b'WIKIWHO!' + b'\x00' * 16))
+        with self.assertRaises(checkpoint.CheckpointError):
+            checkpoint.load(io.BytesIO(checkpoint.MAGIC + b'\xff\x00' + b'\x00' * 16))
+
+    def assert_resumes_from_file(self, file_name, **kwargs):
+        revisions = revisions_of('vandalism')
+        results = []
+        expected = state(analyse(Wikiwho('vandalism', **kwargs), revisions, results), results)
+        results = []
+        analyse(Wikiwho('vandalism', **kwargs), revisions[:20], results)
+        with open(os.path.join(DATA_DIR, file_name), 'rb') as f:
+            wikiwho = checkpoint.load(f)
+        analyse(wikiwho, revisions[20:], results)
+        self.assertEqual(state(wikiwho, results), expected)
+        # and again in the current format
+        wikiwho = dump_and_load(wikiwho)
+        self.assertEqual(state(wikiwho, results), expected)
+        return wikiwho
+
+    def test_version_1(self):
+        wikiwho = self.assert_resumes_from_file('checkpoint_v1.wwc')
+        self.assertEqual(wikiwho.hash_function, 'md5')
+
+    def test_version_2(self):
+        wikiwho = self.assert_resumes_from_file('checkpoint_v2.wwc', hash_function='blake2b-int')
+        self.assertEqual(wikiwho.hash_function, 'blake2b-int')
+
+
+if __name__ == '__main__':
+    unittest.main()
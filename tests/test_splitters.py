@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+utils.split_into_paragraphs and utils.split_into_sentences must give the same paragraphs and sentences as the
+previous splitters, which made a chain of replace passes and inserted markers (see benchmarks/splitters.py).
+"""
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+from WikiWho.benchmarks.splitters import PARAGRAPH_PIECES, SENTENCE_PIECES, legacy_split_into_paragraphs, \
+    legacy_split_into_sentences, random_text, wiki_text
+from WikiWho.utils import split_into_paragraphs, split_into_sentences
+
+
+class TestSplitIntoParagraphs(unittest.TestCase):
+
+    def assert_same_paragraphs(self, text):
+        self.assertEqual(split_into_paragraphs(text), legacy_split_into_paragraphs(text), text)
+
+    def test_special_paragraphs(self):
+        for text in ('', '\n', '\n\n', '\n\n\n', 'a\r\nb\r\n\r\nc', 'a\r\rb', '{|\n|-\n| a\n|}', '{||}', '|-|-\n',
+                     '<table><tr><td>a</td></tr></table>', '</table><table>', 'a|}b{|c', '|-\n|-\n'):
+            self.assert_same_paragraphs(text)
+
+    def test_random_texts(self):
+        rnd = random.Random(42)
+        for _ in range(20000):
+            self.assert_same_paragraphs(random_text(rnd, PARAGRAPH_PIECES))
+
+
+class TestSplitIntoSentences(unittest.TestCase):
+
+    def assert_same_sentences(self, text):
+        self.assertEqual(split_into_sentences(text), legacy_split_into_sentences(text), text)
+
+    def test_special_sentences(self):
+        for text in ('', '.', '. ', 'a. b', 'a.b', '1.5 m. b', 'a; b? c! d: e', 'a\tb', 'a\nb\n', '@', '@@@@',
+                     'a@@@@@@@@b', '<!-- a --> b', '<!---->', '<ref name="a">b</ref>', '<ref/ref>',
+                     'see http://example.org/a b', 'http://', 'a http://a.b/c. d', '@http://a@'):
+            self.assert_same_sentences(text)
+
+    def test_random_texts(self):
+        rnd = random.Random(42)
+        for _ in range(20000):
+            self.assert_same_sentences(random_text(rnd, SENTENCE_PIECES))
+
+    def test_wiki_texts(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            text = wiki_text(rnd, 20).lower()
+            paragraphs = split_into_paragraphs(text)
+            self.assertEqual(paragraphs, legacy_split_into_paragraphs(text), text)
+            for paragraph in paragraphs:
+                self.assert_same_sentences(paragraph)
+
+
+if __name__ == '__main__':
+    unittest.main()
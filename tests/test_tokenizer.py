@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+utils.split_into_tokens must give the same tokens as the previous tokenizer, which made one str.replace pass per
+symbol (see benchmarks/tokenizer.py).
+"""
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+from WikiWho.benchmarks.tokenizer import legacy_split_into_tokens, random_text, wiki_sentence
+from WikiWho.utils import split_into_tokens
+
+
+class TestSplitIntoTokens(unittest.TestCase):
+
+    def assert_same_tokens(self, text):
+        self.assertEqual(split_into_tokens(text), legacy_split_into_tokens(text), text)
+
+    def test_special_tokens(self):
+        for text in ('', ' ', '\n\n', '|', '||', '[[a|b]]', '[[[a]]]', '{{{a}}}', '<!-- a -->', '<!--->',
+                     'ææææ', 'a||ææææ||b', "'''a'''", 'a\tb\rc', '[ [a] ]', '<ref name="a"/>'):
+            self.assert_same_tokens(text)
+
+    def test_random_texts(self):
+        rnd = random.Random(42)
+        for _ in range(20000):
+            self.assert_same_tokens(random_text(rnd))
+
+    def test_wiki_sentences(self):
+        rnd = random.Random(42)
+        for _ in range(5000):
+            self.assert_same_tokens(wiki_sentence(rnd))
+
+
+if __name__ == '__main__':
+    unittest.main()